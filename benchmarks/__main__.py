@@ -0,0 +1,347 @@
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+BASELINE_PATH = (
+    Path(os.getenv("XDG_CACHE_HOME", Path.home() / ".cache"))
+    / "marketplace"
+    / "benchmark-baseline.json"
+)
+
+
+def ensure_jwt_keys():
+    if os.getenv("AUTH_JWT__PRIVATE_KEY_PATH"):
+        return
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    certs = Path(tempfile.mkdtemp(prefix="bench-certs-"))
+    (certs / "jwt-private.pem").write_bytes(
+        key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        )
+    )
+    (certs / "jwt-public.pem").write_bytes(
+        key.public_key().public_bytes(
+            serialization.Encoding.PEM,
+            serialization.PublicFormat.SubjectPublicKeyInfo,
+        )
+    )
+    os.environ["AUTH_JWT__PRIVATE_KEY_PATH"] = str(certs / "jwt-private.pem")
+    os.environ["AUTH_JWT__PUBLIC_KEY_PATH"] = str(certs / "jwt-public.pem")
+
+
+ensure_jwt_keys()
+
+import httpx  # noqa: E402
+from fakeredis import FakeAsyncRedis  # noqa: E402
+from sqlalchemy.ext.asyncio import create_async_engine  # noqa: E402
+
+from benchmarks.standins import InMemoryS3Client, SMTPSink  # noqa: E402
+from src.app.auth.mail_worker import mail_worker  # noqa: E402
+from src.app.auth.send_mail import SMTPSender  # noqa: E402
+from src.app.auth.tokens import create_access_token  # noqa: E402
+from src.app.core.config import settings  # noqa: E402
+from src.app.database.db_helper import db_helper  # noqa: E402
+from src.app.database.minio_helper import s3_helper  # noqa: E402
+from src.app.database.models import Base  # noqa: E402
+from src.app.database.redis_helper import redis_helper  # noqa: E402
+from src.app.main import app  # noqa: E402
+from src.app.schemas.schemas import PrincipalSchema  # noqa: E402
+
+DATABASE_URL_ENV = "BENCHMARK_DATABASE_URL"
+BENCH_PASSWORD = "bench-password"
+ARTICLE_BODY = "Lorem ipsum dolor sit amet. " * 400
+
+
+class Context:
+    def __init__(self):
+        self.username = "bench_user"
+        self.access_token = ""
+        self.refresh_token = ""
+        self.article_ids: list[int] = []
+
+    @property
+    def auth(self) -> dict:
+        return {"Authorization": f"Bearer {self.access_token}"}
+
+
+async def scenario_register(client, ctx, i):
+    return await client.post(
+        "/users/register/",
+        params={
+            "username": f"bench_{i}_{time.monotonic_ns()}",
+            "password": BENCH_PASSWORD,
+            "email": f"bench_{i}_{time.monotonic_ns()}@example.com",
+        },
+    )
+
+
+async def scenario_login(client, ctx, i):
+    return await client.post(
+        "/users/login/",
+        data={"username": ctx.username, "password": BENCH_PASSWORD},
+    )
+
+
+async def scenario_refresh(client, ctx, i):
+    return await client.post(
+        "/users/refresh/",
+        headers={"Authorization": f"Bearer {ctx.refresh_token}"},
+    )
+
+
+async def scenario_upload(client, ctx, i):
+    return await client.post(
+        "/articles/upload/",
+        params={
+            "title": f"bench article {i}",
+            "description": f"benchmark article number {i}",
+            "content": ARTICLE_BODY,
+        },
+        headers=ctx.auth,
+    )
+
+
+async def scenario_random_feed(client, ctx, i):
+    return await client.get(
+        "/articles/random/", params={"page_size": 50, "seed": f"bench-{i % 10}"}
+    )
+
+
+async def scenario_search(client, ctx, i):
+    return await client.get("/articles/search/", params={"query": "bench", "limit": 20})
+
+
+async def scenario_content(client, ctx, i):
+    article_id = ctx.article_ids[i % len(ctx.article_ids)]
+    return await client.get(f"/articles/{article_id}/content")
+
+
+SCENARIOS = {
+    "register": scenario_register,
+    "login": scenario_login,
+    "refresh": scenario_refresh,
+    "upload": scenario_upload,
+    "random_feed": scenario_random_feed,
+    "search": scenario_search,
+    "content": scenario_content,
+}
+
+
+def percentile(latencies: list[float], q: int) -> float:
+    if len(latencies) == 1:
+        return latencies[0]
+    return statistics.quantiles(latencies, n=100, method="inclusive")[q - 1]
+
+
+async def drive(client, ctx, scenario, requests: int, concurrency: int):
+    latencies, errors = [], 0
+    counter = itertools.count()
+
+    async def worker():
+        nonlocal errors
+        while (i := next(counter)) < requests:
+            started = time.perf_counter()
+            response = await scenario(client, ctx, i)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - started
+
+
+async def measure(client, ctx, name, requests, concurrency, alloc_requests):
+    scenario = SCENARIOS[name]
+    latencies, errors, elapsed = await drive(
+        client, ctx, scenario, requests, concurrency
+    )
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    before, _ = tracemalloc.get_traced_memory()
+    await drive(client, ctx, scenario, alloc_requests, 1)
+    after, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "requests": requests,
+        "errors": errors,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "throughput_rps": requests / elapsed,
+        "peak_alloc_kib": (peak - before) / 1024,
+        "retained_kib_per_request": (after - before) / 1024 / alloc_requests,
+    }
+
+
+async def prepare(client, ctx):
+    user = PrincipalSchema(username=ctx.username, email="bench@example.com")
+    await client.post(
+        "/users/register/",
+        params={
+            "username": ctx.username,
+            "password": BENCH_PASSWORD,
+            "email": user.email,
+        },
+    )
+    confirm_token = create_access_token(user)
+    await client.post(
+        f"/users/confirm/{confirm_token}",
+        headers={"Authorization": f"Bearer {confirm_token}"},
+    )
+    response = await client.post(
+        "/users/login/", data={"username": ctx.username, "password": BENCH_PASSWORD}
+    )
+    response.raise_for_status()
+    tokens = response.json()
+    ctx.access_token = tokens["access_token"]
+    ctx.refresh_token = tokens["refresh_token"]
+
+
+def use_benchmark_database(url: str):
+    db_helper.engine = create_async_engine(url=url, **db_helper.engine_options)
+    db_helper.session_factory.configure(bind=db_helper.engine)
+    db_helper.replicas = []
+
+
+async def run(args) -> dict:
+    use_benchmark_database(args.database_url)
+    s3_helper._client = InMemoryS3Client()
+    await s3_helper.ensure_bucket()
+    redis_helper.client = FakeAsyncRedis()
+    smtp_sink = SMTPSink()
+    smtp_sink.start()
+    mail_worker.sender = SMTPSender(
+        host=smtp_sink.hostname,
+        port=smtp_sink.port,
+        sender="bench@example.com",
+        password=None,
+        starttls=False,
+    )
+    async with db_helper.engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    mail_task = asyncio.create_task(mail_worker.run())
+
+    results = {}
+    ctx = Context()
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://bench"
+        ) as client:
+            await prepare(client, ctx)
+            for name in args.scenarios:
+                if name == "content" and not ctx.article_ids:
+                    feed = await client.get(
+                        "/articles/random/", params={"page_size": 100}
+                    )
+                    ctx.article_ids = [a["id"] for a in feed.json()["articles"]]
+                    if not ctx.article_ids:
+                        print("content   skipped, run the upload scenario first")
+                        continue
+                results[name] = await measure(
+                    client,
+                    ctx,
+                    name,
+                    args.requests,
+                    args.concurrency,
+                    max(min(args.alloc_requests, args.requests), 1),
+                )
+                print(f"{name:12} {format_result(results[name])}", flush=True)
+    finally:
+        mail_task.cancel()
+        smtp_sink.stop()
+        async with db_helper.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+        await db_helper.dispose()
+    return results
+
+
+def format_result(result: dict) -> str:
+    return (
+        f"p50={result['p50_ms']:.2f}ms p95={result['p95_ms']:.2f}ms "
+        f"p99={result['p99_ms']:.2f}ms rps={result['throughput_rps']:.1f} "
+        f"peak={result['peak_alloc_kib']:.0f}KiB errors={result['errors']}"
+    )
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if result["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            regressions.append(
+                f"{name}: p95 {result['p95_ms']:.2f}ms > "
+                f"baseline {base['p95_ms']:.2f}ms"
+            )
+        if result["throughput_rps"] < base["throughput_rps"] * (1 - tolerance):
+            regressions.append(
+                f"{name}: throughput {result['throughput_rps']:.1f}rps < "
+                f"baseline {base['throughput_rps']:.1f}rps"
+            )
+        if result["errors"] > base["errors"]:
+            regressions.append(f"{name}: {result['errors']} errors")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Marketplace endpoint benchmarks")
+    parser.add_argument(
+        "--scenarios", nargs="+", default=list(SCENARIOS), choices=list(SCENARIOS)
+    )
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--alloc-requests", type=int, default=50)
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--output", type=Path)
+    parser.add_argument(
+        "--database-url",
+        default=os.getenv(DATABASE_URL_ENV),
+        help=f"throwaway database, dropped and recreated (or ${DATABASE_URL_ENV})",
+    )
+    args = parser.parse_args()
+    if not args.database_url:
+        parser.error(f"--database-url or ${DATABASE_URL_ENV} is required")
+    if args.database_url == settings.DATABASE_URL_asyncpg:
+        parser.error("refusing to benchmark against the application database")
+    if not args.update_baseline and not args.baseline.exists():
+        parser.error(f"no baseline at {args.baseline}, run with --update-baseline")
+
+    results = asyncio.run(run(args))
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+    if args.update_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(results, indent=2) + "\n")
+        print(f"baseline written to {args.baseline}")
+        return 0
+
+    baseline = json.loads(args.baseline.read_text())
+    regressions = compare(results, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,188 @@
+import hashlib
+import re
+import socket
+import uuid
+from datetime import datetime, timezone
+
+from aiosmtpd.controller import Controller
+from botocore.exceptions import ClientError
+
+
+def client_error(code: str, operation: str) -> ClientError:
+    return ClientError({"Error": {"Code": code, "Message": code}}, operation)
+
+
+class InMemoryBody:
+    def __init__(self, data: bytes):
+        self._data = data
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def read(self) -> bytes:
+        return self._data
+
+    def close(self):
+        pass
+
+    async def iter_chunks(self, chunk_size: int = 1024):
+        for offset in range(0, len(self._data), chunk_size):
+            yield self._data[offset : offset + chunk_size]
+
+
+class InMemoryS3Client:
+    def __init__(self):
+        self.buckets: dict[str, dict[str, dict]] = {}
+        self.uploads: dict[str, dict] = {}
+
+    async def head_bucket(self, Bucket):
+        if Bucket not in self.buckets:
+            raise client_error("404", "HeadBucket")
+        return {}
+
+    async def create_bucket(self, Bucket):
+        self.buckets.setdefault(Bucket, {})
+        return {}
+
+    async def put_object(self, Bucket, Key, Body, ContentType=None, **kwargs):
+        data = Body if isinstance(Body, bytes) else Body.encode()
+        self.buckets[Bucket][Key] = {
+            "Body": data,
+            "ContentType": ContentType or "binary/octet-stream",
+            "ETag": f'"{hashlib.md5(data).hexdigest()}"',
+            "LastModified": datetime.now(timezone.utc).replace(microsecond=0),
+            "Metadata": kwargs.get("Metadata", {}),
+            "ContentEncoding": kwargs.get("ContentEncoding"),
+        }
+        return {"ETag": self.buckets[Bucket][Key]["ETag"]}
+
+    async def get_object(self, Bucket, Key, Range=None, IfMatch=None, **kwargs):
+        obj = self._get(Bucket, Key, "GetObject")
+        if IfMatch is not None and IfMatch != obj["ETag"]:
+            raise client_error("PreconditionFailed", "GetObject")
+        data = obj["Body"]
+        response = {
+            "ContentType": obj["ContentType"],
+            "ETag": obj["ETag"],
+            "LastModified": obj["LastModified"],
+            "Metadata": obj["Metadata"],
+        }
+        if obj["ContentEncoding"]:
+            response["ContentEncoding"] = obj["ContentEncoding"]
+        if Range:
+            start, end = self._resolve_range(Range, len(data))
+            response["ContentRange"] = f"bytes {start}-{end}/{len(data)}"
+            data = data[start : end + 1]
+        response["Body"] = InMemoryBody(data)
+        response["ContentLength"] = len(data)
+        return response
+
+    async def delete_object(self, Bucket, Key):
+        self.buckets.get(Bucket, {}).pop(Key, None)
+        return {}
+
+    async def head_object(self, Bucket, Key, **kwargs):
+        obj = self._get(Bucket, Key, "HeadObject")
+        response = {
+            "ContentLength": len(obj["Body"]),
+            "ContentType": obj["ContentType"],
+            "ETag": obj["ETag"],
+            "LastModified": obj["LastModified"],
+            "Metadata": obj["Metadata"],
+        }
+        if obj["ContentEncoding"]:
+            response["ContentEncoding"] = obj["ContentEncoding"]
+        return response
+
+    async def generate_presigned_url(self, ClientMethod, Params, ExpiresIn):
+        return f"http://s3.bench/{Params['Bucket']}/{Params['Key']}?expires={ExpiresIn}"
+
+    async def delete_objects(self, Bucket, Delete):
+        for obj in Delete["Objects"]:
+            self.buckets.get(Bucket, {}).pop(obj["Key"], None)
+        return {}
+
+    async def create_multipart_upload(self, Bucket, Key, **kwargs):
+        upload_id = uuid.uuid4().hex
+        self.uploads[upload_id] = {
+            "Bucket": Bucket,
+            "Key": Key,
+            "Initiated": datetime.now(timezone.utc),
+            "Parts": {},
+            "Params": kwargs,
+        }
+        return {"UploadId": upload_id}
+
+    async def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        upload = self._upload(UploadId, "UploadPart")
+        upload["Parts"][PartNumber] = Body
+        return {"ETag": f'"{hashlib.md5(Body).hexdigest()}"'}
+
+    async def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        upload = self._upload(UploadId, "CompleteMultipartUpload")
+        body = b"".join(
+            upload["Parts"][part["PartNumber"]] for part in MultipartUpload["Parts"]
+        )
+        del self.uploads[UploadId]
+        return await self.put_object(Bucket, Key, body, **upload["Params"])
+
+    async def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self._upload(UploadId, "AbortMultipartUpload")
+        del self.uploads[UploadId]
+        return {}
+
+    async def copy_object(self, Bucket, Key, CopySource, MetadataDirective, **kwargs):
+        source = self._get(CopySource["Bucket"], CopySource["Key"], "CopyObject")
+        return await self.put_object(Bucket, Key, source["Body"], **kwargs)
+
+    def _upload(self, upload_id: str, operation: str) -> dict:
+        upload = self.uploads.get(upload_id)
+        if upload is None:
+            raise client_error("NoSuchUpload", operation)
+        return upload
+
+    def _get(self, bucket: str, key: str, operation: str) -> dict:
+        obj = self.buckets.get(bucket, {}).get(key)
+        if obj is None:
+            raise client_error("NoSuchKey", operation)
+        return obj
+
+    @staticmethod
+    def _resolve_range(byte_range: str, total: int) -> tuple[int, int]:
+        match = re.match(r"^bytes=(\d*)-(\d*)$", byte_range)
+        if not match or total == 0:
+            raise client_error("InvalidRange", "GetObject")
+        first, last = match.groups()
+        if not first:
+            return max(total - int(last), 0), total - 1
+        start, end = int(first), min(int(last), total - 1) if last else total - 1
+        if start > end:
+            raise client_error("InvalidRange", "GetObject")
+        return start, end
+
+
+class SMTPSink:
+    def __init__(self, hostname: str = "127.0.0.1"):
+        self.hostname = hostname
+        self.port = free_port(hostname)
+        self.messages = 0
+        self._controller = Controller(self, hostname=hostname, port=self.port)
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages += 1
+        return "250 Message accepted"
+
+    def start(self):
+        self._controller.start()
+
+    def stop(self):
+        self._controller.stop()
+
+
+def free_port(hostname: str) -> int:
+    with socket.socket() as sock:
+        sock.bind((hostname, 0))
+        return sock.getsockname()[1]
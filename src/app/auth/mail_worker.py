@@ -0,0 +1,121 @@
+import asyncio
+import json
+import logging
+import time
+
+from redis.exceptions import RedisError
+
+from src.app.auth.send_mail import (
+    MailQueue,
+    SMTPSender,
+    build_confirmation_email,
+    mail_queue,
+    smtp_sender,
+)
+from src.app.core.config import settings
+from src.app.database.redis_helper import redis_helper
+
+
+class MailWorker:
+    def __init__(
+        self,
+        queue: MailQueue,
+        sender: SMTPSender,
+        batch_size: int,
+        max_attempts: int,
+        poll_timeout: float = 5.0,
+        retry_base_seconds: float = 30.0,
+        retry_max_seconds: float = 3600.0,
+    ):
+        self.queue = queue
+        self.sender = sender
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.poll_timeout = poll_timeout
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self.logger = logging.getLogger(__name__)
+
+    async def run(self):
+        try:
+            while True:
+                started = time.monotonic()
+                try:
+                    processed = await self.process_batch()
+                except RedisError as e:
+                    self.logger.warning(f"Mail queue unavailable: {e}")
+                    await asyncio.sleep(1)
+                    continue
+                except Exception as e:
+                    self.logger.exception(f"Mail batch failed: {e}")
+                    await asyncio.sleep(1)
+                    continue
+                if not processed:
+                    elapsed = time.monotonic() - started
+                    await asyncio.sleep(max(self.poll_timeout - elapsed, 0))
+        finally:
+            await asyncio.to_thread(self.sender.close)
+
+    async def process_batch(self) -> int:
+        claimed = await self.queue.claim(self.batch_size, self.poll_timeout)
+        if not claimed:
+            return 0
+        pending = []
+        for entry_id, raw in claimed:
+            try:
+                message = json.loads(raw)
+                body = build_confirmation_email(
+                    message["token"], message["address"], self.sender.sender
+                )
+            except Exception as e:
+                self.logger.error(f"Dead-lettering malformed mail {entry_id!r}: {e}")
+                await self.queue.dead_letter(entry_id, raw, repr(e))
+                continue
+            pending.append((entry_id, raw, message, body))
+        if not pending:
+            return len(claimed)
+
+        results = await asyncio.to_thread(
+            self.sender.send_batch,
+            [(message["address"], body) for _, _, message, body in pending],
+        )
+        for (entry_id, raw, message, _), error in zip(pending, results):
+            if error is None:
+                await self.queue.ack(entry_id)
+                continue
+            attempt = message.get("attempt", 0) + 1
+            if attempt < self.max_attempts:
+                delay = min(
+                    self.retry_base_seconds * 2 ** (attempt - 1),
+                    self.retry_max_seconds,
+                )
+                await self.queue.retry_later(
+                    entry_id, {**message, "attempt": attempt}, delay
+                )
+            else:
+                self.logger.error(f"Giving up on mail {entry_id!r}: {error}")
+                await self.queue.dead_letter(entry_id, raw, repr(error))
+        return len(claimed)
+
+
+mail_worker = MailWorker(
+    queue=mail_queue,
+    sender=smtp_sender,
+    batch_size=settings.mail.batch_size,
+    max_attempts=settings.mail.max_attempts,
+    poll_timeout=settings.redis.socket_timeout / 2,
+    retry_base_seconds=settings.mail.retry_base_seconds,
+    retry_max_seconds=settings.mail.retry_max_seconds,
+)
+
+
+async def main():
+    try:
+        await mail_worker.run()
+    finally:
+        await redis_helper.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
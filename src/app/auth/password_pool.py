@@ -0,0 +1,85 @@
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from fastapi import HTTPException
+from starlette import status
+
+from src.app.auth import utils as auth_utils
+from src.app.core.config import settings
+from src.app.core.metrics import AUTH_CPU_SECONDS, cpu_timed
+
+
+class PasswordHasher:
+    def __init__(
+        self,
+        executor: str,
+        max_workers: int,
+        max_queue: int,
+        rounds: int,
+        retry_after_seconds: int,
+    ):
+        self.executor_type = executor
+        self.max_workers = max_workers
+        self.max_pending = max_workers + max_queue
+        self.rounds = rounds
+        self.retry_after_seconds = retry_after_seconds
+        self.pending = 0
+        self.rejected = 0
+        self._executor: Executor | None = None
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            if self.executor_type == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="bcrypt"
+                )
+        return self._executor
+
+    async def hash(self, password: str) -> bytes:
+        return await self._run(
+            "bcrypt_hash", auth_utils.hash_password, password, self.rounds
+        )
+
+    async def verify(self, password: str, hashed_password: bytes) -> bool:
+        return await self._run(
+            "bcrypt_verify", auth_utils.validate_password, password, hashed_password
+        )
+
+    def needs_rehash(self, hashed_password: bytes) -> bool:
+        return auth_utils.password_hash_rounds(hashed_password) != self.rounds
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def _run(self, operation: str, func, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="password hashing is overloaded, retry later",
+                headers={"Retry-After": str(self.retry_after_seconds)},
+            )
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            result, cpu_seconds = await loop.run_in_executor(
+                self.executor, cpu_timed, func, *args
+            )
+        finally:
+            self.pending -= 1
+        AUTH_CPU_SECONDS.labels(operation).observe(cpu_seconds)
+        return result
+
+
+password_hasher = PasswordHasher(
+    executor=settings.password_hashing.executor,
+    max_workers=settings.password_hashing.max_workers,
+    max_queue=settings.password_hashing.max_queue,
+    rounds=settings.password_hashing.rounds,
+    retry_after_seconds=settings.password_hashing.retry_after_seconds,
+)
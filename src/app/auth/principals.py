@@ -0,0 +1,87 @@
+import logging
+from typing import Awaitable, Callable, Optional
+
+from redis.exceptions import RedisError
+
+from src.app.core.cache import LRUCache
+from src.app.core.config import settings
+from src.app.database.models import UserModel
+from src.app.database.redis_helper import RedisHelper, redis_helper
+from src.app.schemas.schemas import PrincipalSchema
+
+INVALIDATION_CHANNEL = "auth:principal:invalidate"
+
+
+class PrincipalCache:
+    def __init__(
+        self,
+        redis: RedisHelper,
+        local: LRUCache,
+        redis_ttl_seconds: int,
+        prefix: str = "auth:principal:",
+    ):
+        self.redis = redis
+        self.local = local
+        self.redis_ttl_seconds = redis_ttl_seconds
+        self.prefix = prefix
+        self.logger = logging.getLogger(__name__)
+        redis.subscribe(
+            INVALIDATION_CHANNEL, self.local.delete, on_subscribe=self._reset_local
+        )
+
+    async def get(
+        self,
+        username: str,
+        loader: Callable[[], Awaitable[Optional[UserModel]]],
+    ) -> Optional[PrincipalSchema]:
+        user = self.local.get(username)
+        if user is not None:
+            return user
+
+        try:
+            raw = await self.redis.client.get(self.prefix + username)
+        except RedisError as e:
+            self.logger.warning(f"Principal cache read failed for {username}: {e}")
+            raw = None
+        if raw is not None:
+            user = PrincipalSchema.model_validate_json(raw)
+        else:
+            model = await loader()
+            if model is None:
+                return None
+            user = PrincipalSchema(
+                username=model.username,
+                email=model.email,
+                active=bool(model.active),
+            )
+            try:
+                await self.redis.client.set(
+                    self.prefix + username,
+                    user.model_dump_json(),
+                    ex=self.redis_ttl_seconds,
+                )
+            except RedisError as e:
+                self.logger.warning(f"Principal cache write failed for {username}: {e}")
+        self.local.set(username, user)
+        return user
+
+    async def invalidate(self, username: str):
+        self.local.delete(username)
+        try:
+            await self.redis.client.delete(self.prefix + username)
+            await self.redis.publish(INVALIDATION_CHANNEL, username)
+        except RedisError as e:
+            self.logger.error(f"Failed to invalidate principal {username}: {e}")
+
+    async def _reset_local(self):
+        self.local.clear()
+
+
+principal_cache = PrincipalCache(
+    redis=redis_helper,
+    local=LRUCache(
+        max_items=settings.principal_cache.max_items,
+        ttl_seconds=settings.principal_cache.local_ttl_seconds,
+    ),
+    redis_ttl_seconds=settings.principal_cache.redis_ttl_seconds,
+)
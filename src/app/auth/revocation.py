@@ -0,0 +1,78 @@
+import time
+
+from src.app.database.redis_helper import RedisHelper, redis_helper
+
+REVOKED_PREFIX = "auth:revoked:"
+REVOCATION_CHANNEL = "auth:revoked"
+
+
+class RevokedTokens:
+    def __init__(self, redis: RedisHelper, prune_every: int = 1000):
+        self.redis = redis
+        self.prune_every = prune_every
+        self._revoked: dict[str, float] = {}
+        self._added = 0
+        redis.subscribe(REVOCATION_CHANNEL, self._on_revoked, on_subscribe=self.load)
+
+    def __len__(self) -> int:
+        return len(self._revoked)
+
+    def is_revoked(self, jti: str | None) -> bool:
+        if jti is None:
+            return False
+        expires_at = self._revoked.get(jti)
+        return expires_at is not None and expires_at > time.time()
+
+    async def revoke(self, jti: str, expires_at: float):
+        ttl = int(expires_at - time.time())
+        if ttl <= 0:
+            return
+        self._add(jti, expires_at)
+        await self.redis.client.set(REVOKED_PREFIX + jti, expires_at, ex=ttl)
+        await self.redis.publish(REVOCATION_CHANNEL, f"{jti}:{expires_at}")
+
+    async def consume(self, jti: str, expires_at: float) -> bool:
+        ttl = int(expires_at - time.time())
+        if ttl <= 0 or self.is_revoked(jti):
+            return False
+        claimed = await self.redis.client.set(
+            REVOKED_PREFIX + jti, expires_at, ex=ttl, nx=True
+        )
+        if not claimed:
+            return False
+        self._add(jti, expires_at)
+        await self.redis.publish(REVOCATION_CHANNEL, f"{jti}:{expires_at}")
+        return True
+
+    async def load(self):
+        keys = [
+            key
+            async for key in self.redis.client.scan_iter(
+                match=REVOKED_PREFIX + "*", count=1000
+            )
+        ]
+        for start in range(0, len(keys), 1000):
+            batch = keys[start : start + 1000]
+            values = await self.redis.client.mget(batch)
+            for key, expires_at in zip(batch, values):
+                if expires_at is not None:
+                    jti = key.decode()[len(REVOKED_PREFIX) :]
+                    self._add(jti, float(expires_at))
+
+    def _on_revoked(self, message: str):
+        jti, expires_at = message.rsplit(":", 1)
+        self._add(jti, float(expires_at))
+
+    def _add(self, jti: str, expires_at: float):
+        self._revoked[jti] = expires_at
+        self._added += 1
+        if self._added % self.prune_every == 0:
+            now = time.time()
+            self._revoked = {
+                jti: expires_at
+                for jti, expires_at in self._revoked.items()
+                if expires_at > now
+            }
+
+
+revoked_tokens = RevokedTokens(redis_helper)
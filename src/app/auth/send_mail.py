@@ -1,47 +1,237 @@
+import json
+import logging
 import os
-from dotenv import load_dotenv
 import smtplib
+import socket
+import time
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
+from functools import lru_cache
 from pathlib import Path
 
-from jinja2 import Environment, FileSystemLoader
+from dotenv import load_dotenv
+from jinja2 import Environment, FileSystemLoader, Template
+from redis.exceptions import ResponseError, WatchError
+
+from src.app.core.config import settings
+from src.app.database.redis_helper import RedisHelper, redis_helper
 
 load_dotenv()
 
+templates = Environment(loader=FileSystemLoader(Path(__file__).parent))
+
+
+@lru_cache
+def get_template(name: str) -> Template:
+    return templates.get_template(name)
+
 
 def render_confirmation_email(confirmation_link: str) -> str:
-    templates_dir = Path(__file__).parent
-    env = Environment(loader=FileSystemLoader(templates_dir))
-    template = env.get_template("confirmation_email.html")
+    template = get_template("confirmation_email.html")
     return template.render(confirmation_link=confirmation_link)
 
 
-def send_email(token, address):
-    sender = os.getenv("EMAIL_SENDER")
-    password = os.getenv("EMAIL_PASSWORD")
-
-    server = smtplib.SMTP("74.125.143.108", 587)
-    server.ehlo()
-    server.starttls()
-    confirmation_link = f"http://localhost:8000/confirm/{token}"
-    html_content = render_confirmation_email(confirmation_link)
-
-    try:
-        server.login(sender, password)
-        msg = MIMEMultipart()
-        msg["Subject"] = "Подтверждение Test"
-        msg["To"] = address
-        msg["From"] = sender
-        msg.attach(MIMEText(html_content, "html"))
-
-        server.sendmail(
-            sender,
-            address,
-            msg.as_string(),
+def build_confirmation_email(token: str, address: str, sender: str) -> str:
+    confirmation_link = settings.mail.confirmation_url.format(token=token)
+    msg = MIMEMultipart()
+    msg["Subject"] = "Подтверждение Test"
+    msg["To"] = address
+    msg["From"] = sender
+    msg.attach(MIMEText(render_confirmation_email(confirmation_link), "html"))
+    return msg.as_string()
+
+
+class MailQueue:
+    def __init__(
+        self,
+        redis: RedisHelper,
+        stream_key: str,
+        group: str,
+        dead_letter_key: str,
+        retry_key: str,
+        claim_idle_seconds: float,
+        dead_letter_max_len: int = 10000,
+        consumer: str | None = None,
+    ):
+        self.redis = redis
+        self.stream_key = stream_key
+        self.group = group
+        self.dead_letter_key = dead_letter_key
+        self.retry_key = retry_key
+        self.claim_idle_seconds = claim_idle_seconds
+        self.dead_letter_max_len = dead_letter_max_len
+        self.consumer = consumer or f"{socket.gethostname()}-{os.getpid()}"
+        self._group_ready = False
+        self._next_autoclaim = 0.0
+
+    async def enqueue_confirmation(self, token: str, address: str, attempt: int = 0):
+        message = {"token": token, "address": address, "attempt": attempt}
+        await self.redis.client.xadd(self.stream_key, {"message": json.dumps(message)})
+
+    async def claim(
+        self, batch_size: int, timeout: float
+    ) -> list[tuple[bytes, bytes | None]]:
+        await self._ensure_group()
+        await self._promote_due_retries(batch_size)
+        entries = []
+        if time.monotonic() >= self._next_autoclaim:
+            _, entries, *_ = await self.redis.client.xautoclaim(
+                self.stream_key,
+                self.group,
+                self.consumer,
+                min_idle_time=int(self.claim_idle_seconds * 1000),
+                count=batch_size,
+            )
+            if not entries:
+                self._next_autoclaim = time.monotonic() + self.claim_idle_seconds / 2
+        if not entries:
+            response = await self.redis.client.xreadgroup(
+                self.group,
+                self.consumer,
+                {self.stream_key: ">"},
+                count=batch_size,
+                block=int(timeout * 1000),
+            )
+            entries = response[0][1] if response else []
+        return [
+            (entry_id, fields.get(b"message") if fields else None)
+            for entry_id, fields in entries
+        ]
+
+    async def ack(self, entry_id: bytes):
+        async with self.redis.client.pipeline(transaction=False) as pipe:
+            pipe.xack(self.stream_key, self.group, entry_id)
+            pipe.xdel(self.stream_key, entry_id)
+            await pipe.execute()
+
+    async def retry_later(self, entry_id: bytes, message: dict, delay: float):
+        member = json.dumps({**message, "retry_of": entry_id.decode()})
+        async with self.redis.client.pipeline(transaction=True) as pipe:
+            pipe.zadd(self.retry_key, {member: time.time() + delay})
+            pipe.xack(self.stream_key, self.group, entry_id)
+            pipe.xdel(self.stream_key, entry_id)
+            await pipe.execute()
+
+    async def dead_letter(self, entry_id: bytes, raw: bytes | str | None, error: str):
+        await self.redis.client.xadd(
+            self.dead_letter_key,
+            {"entry_id": entry_id, "message": raw or b"", "error": error},
+            maxlen=self.dead_letter_max_len,
+            approximate=True,
         )
-        return "the message was send"
-    except Exception as e:
-        return f"error: {e}"
-    finally:
-        server.quit()
+        await self.ack(entry_id)
+
+    async def _promote_due_retries(self, batch_size: int):
+        async with self.redis.client.pipeline(transaction=True) as pipe:
+            try:
+                await pipe.watch(self.retry_key)
+                due = await pipe.zrangebyscore(
+                    self.retry_key, "-inf", time.time(), start=0, num=batch_size
+                )
+                if not due:
+                    return
+                pipe.multi()
+                pipe.zrem(self.retry_key, *due)
+                for member in due:
+                    pipe.xadd(self.stream_key, {"message": member})
+                await pipe.execute()
+            except WatchError:
+                pass
+
+    async def _ensure_group(self):
+        if self._group_ready:
+            return
+        try:
+            await self.redis.client.xgroup_create(
+                self.stream_key, self.group, id="0", mkstream=True
+            )
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+        self._group_ready = True
+
+
+class SMTPSender:
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        sender: str | None,
+        password: str | None,
+        starttls: bool = True,
+        timeout: float = 10.0,
+        idle_timeout_seconds: float = 60.0,
+    ):
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+        self.idle_timeout_seconds = idle_timeout_seconds
+        self.logger = logging.getLogger(__name__)
+        self._server: smtplib.SMTP | None = None
+        self._last_used = 0.0
+
+    def send_batch(self, messages: list[tuple[str, str]]) -> list[Exception | None]:
+        results = []
+        for address, body in messages:
+            try:
+                self._send(address, body)
+                results.append(None)
+            except Exception as e:
+                self.logger.error(f"Failed to send mail to {address}: {e}")
+                results.append(e)
+        return results
+
+    def close(self):
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._server = None
+
+    def _send(self, address: str, body: str):
+        try:
+            self._connection().sendmail(self.sender, address, body)
+        except (smtplib.SMTPServerDisconnected, ConnectionError):
+            self.close()
+            self._connection().sendmail(self.sender, address, body)
+        self._last_used = time.monotonic()
+
+    def _connection(self) -> smtplib.SMTP:
+        if self._server is not None:
+            if time.monotonic() - self._last_used > self.idle_timeout_seconds:
+                self.close()
+        if self._server is None:
+            server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            server.ehlo()
+            if self.starttls:
+                server.starttls()
+                server.ehlo()
+            if self.password:
+                server.login(self.sender, self.password)
+            self._server = server
+        return self._server
+
+
+mail_queue = MailQueue(
+    redis=redis_helper,
+    stream_key=settings.mail.stream_key,
+    group=settings.mail.consumer_group,
+    dead_letter_key=settings.mail.dead_letter_key,
+    retry_key=settings.mail.retry_key,
+    claim_idle_seconds=settings.mail.claim_idle_seconds,
+    dead_letter_max_len=settings.mail.dead_letter_max_len,
+)
+
+smtp_sender = SMTPSender(
+    host=settings.mail.smtp_host,
+    port=settings.mail.smtp_port,
+    sender=settings.mail.sender or os.getenv("EMAIL_SENDER"),
+    password=settings.mail.password or os.getenv("EMAIL_PASSWORD"),
+    starttls=settings.mail.starttls,
+    timeout=settings.mail.smtp_timeout,
+    idle_timeout_seconds=settings.mail.idle_timeout_seconds,
+)
@@ -1,3 +1,4 @@
+import uuid
 from datetime import timedelta
 
 from fastapi import Depends, Form, HTTPException
@@ -7,14 +8,19 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 
 from src.app.auth import utils as auth_utils
+from src.app.auth.password_pool import password_hasher
+from src.app.auth.principals import principal_cache
+from src.app.auth.revocation import revoked_tokens
 from src.app.core.config import settings
 from src.app.database.db_helper import db_helper
 from src.app.repositories.users_repository import UserRepository
-from src.app.schemas.schemas import UserSchema
+from src.app.schemas.schemas import PrincipalSchema, UserSchema
 
 TOKEN_TYPE = "type"
 ACCESS_TOKEN_TYPE = "access"
 REFRESH_TOKEN_TYPE = "refresh"
+BEARER_TOKEN_TYPES = (ACCESS_TOKEN_TYPE, REFRESH_TOKEN_TYPE)
+SESSION_ID = "sid"
 
 http_bearer = HTTPBearer(auto_error=False)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/jwt/login/")
@@ -35,13 +41,21 @@ def create_jwt(
     )
 
 
-def create_access_token(user: UserSchema) -> str:
+def new_session_id() -> str:
+    return uuid.uuid4().hex
+
+
+def create_access_token(
+    user: UserSchema | PrincipalSchema, session_id: str | None = None
+) -> str:
     jwt_payload = {
         "sub": user.username,
         "username": user.username,
         "email": user.email,
         "active": user.active,
     }
+    if session_id:
+        jwt_payload[SESSION_ID] = session_id
     return create_jwt(
         token_type=ACCESS_TOKEN_TYPE,
         token_data=jwt_payload,
@@ -49,8 +63,8 @@ def create_access_token(user: UserSchema) -> str:
     )
 
 
-def create_refresh_token(user: UserSchema) -> str:
-    jwt_payload = {"sub": user.username}
+def create_refresh_token(user: UserSchema | PrincipalSchema, session_id: str) -> str:
+    jwt_payload = {"sub": user.username, SESSION_ID: session_id}
     return create_jwt(
         token_type=REFRESH_TOKEN_TYPE,
         token_data=jwt_payload,
@@ -58,13 +72,24 @@ def create_refresh_token(user: UserSchema) -> str:
     )
 
 
-def get_current_token_payload(token: str = Depends(oauth2_scheme)) -> UserSchema:
+async def get_current_token_payload(token: str = Depends(oauth2_scheme)) -> dict:
     try:
-        payload = auth_utils.decode_jwt(token=token)
+        payload = auth_utils.decode_jwt_cached(token=token)
     except InvalidTokenError as e:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail=f"invalid token: {e}"
         )
+    if payload.get(TOKEN_TYPE) not in BEARER_TOKEN_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=f"invalid token type {payload.get(TOKEN_TYPE)!r}",
+        )
+    if revoked_tokens.is_revoked(payload.get("jti")) or revoked_tokens.is_revoked(
+        payload.get(SESSION_ID)
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="token revoked"
+        )
     return payload
 
 
@@ -78,12 +103,18 @@ def validate_token_type(payload: dict, token_type: str) -> bool:
     )
 
 
-async def get_user_by_token_sub(
-    payload: dict, session: AsyncSession = Depends(db_helper.session_dependency)
-) -> UserSchema:
-    username: str | None = payload.get("username")
-    user_repo = UserRepository(session)
-    user = await user_repo.get_user(username=username)
+async def load_user_from_primary(username: str):
+    async with db_helper.session_factory() as session:
+        return await UserRepository(session).get(username=username)
+
+
+async def get_user_by_token_sub(payload: dict) -> PrincipalSchema:
+    username: str | None = payload.get("sub")
+    user = None
+    if username:
+        user = await principal_cache.get(
+            username, loader=lambda: load_user_from_primary(username)
+        )
     if user:
         return user
     raise HTTPException(
@@ -94,19 +125,21 @@ async def get_user_by_token_sub(
 
 async def get_current_auth_user(
     payload: dict = Depends(get_current_token_payload),
-) -> UserSchema:
+) -> PrincipalSchema:
     validate_token_type(payload, ACCESS_TOKEN_TYPE)
     return await get_user_by_token_sub(payload)
 
 
 async def get_current_auth_user_for_refresh(
     payload: dict = Depends(get_current_token_payload),
-) -> UserSchema:
+) -> PrincipalSchema:
     validate_token_type(payload, REFRESH_TOKEN_TYPE)
     return await get_user_by_token_sub(payload)
 
 
-def get_current_active_auth_user(user: UserSchema = Depends(get_current_auth_user)):
+def get_current_active_auth_user(
+    user: PrincipalSchema = Depends(get_current_auth_user),
+):
     if user.active:
         return user
     raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="user inactive")
@@ -115,7 +148,7 @@ def get_current_active_auth_user(user: UserSchema = Depends(get_current_auth_use
 async def validate_auth_user(
     username: str = Form(),
     password: str = Form(),
-    session: AsyncSession = Depends(db_helper.session_dependency),
+    session: AsyncSession = Depends(db_helper.read_session_dependency),
 ):
     unauthorized_exc = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED, detail="invalid username or password"
@@ -126,9 +159,19 @@ async def validate_auth_user(
     if not user:
         raise unauthorized_exc
 
-    if not auth_utils.validate_password(
+    if not await password_hasher.verify(
         password=password,
         hashed_password=user.password,
     ):
         raise unauthorized_exc
+
+    if password_hasher.needs_rehash(user.password):
+        try:
+            new_hash = await password_hasher.hash(password)
+        except HTTPException:
+            return user
+        async with db_helper.session_factory() as write_session:
+            await UserRepository(write_session).update_password(
+                username=username, password=new_hash
+            )
     return user
@@ -1,14 +1,33 @@
+import hashlib
+import time
+import uuid
 from datetime import datetime, timedelta
+from pathlib import Path
 
 import bcrypt
 import jwt
+from jwt.algorithms import get_default_algorithms
 
+from src.app.core.cache import LRUCache
 from src.app.core.config import settings
+from src.app.core.metrics import track_cpu
+
+
+def load_jwt_key(path: Path, algorithm: str = settings.auth_jwt.algorithm):
+    return get_default_algorithms()[algorithm].prepare_key(path.read_text())
+
+
+_private_key = load_jwt_key(settings.auth_jwt.private_key_path)
+_public_key = load_jwt_key(settings.auth_jwt.public_key_path)
+_verified_tokens = LRUCache(
+    max_items=settings.auth_jwt.verified_cache_size,
+    ttl_seconds=settings.auth_jwt.verified_cache_ttl_seconds,
+)
 
 
 def encode_jwt(
     payload: dict,
-    private_key: str = settings.auth_jwt.private_key_path.read_text(),
+    private_key=_private_key,
     algorithm: str = settings.auth_jwt.algorithm,
     expire_minutes: int = settings.auth_jwt.access_token_expire_minutes,
     expire_timedelta: timedelta | None = None,
@@ -21,29 +40,49 @@ def encode_jwt(
         expire = now + timedelta(minutes=expire_minutes)
 
     to_encode.update({"exp": expire, "iat": now})
-    encoded = jwt.encode(
-        to_encode,
-        private_key,
-        algorithm=algorithm,
-    )
+    to_encode.setdefault("jti", uuid.uuid4().hex)
+    with track_cpu("jwt_encode"):
+        encoded = jwt.encode(
+            to_encode,
+            private_key,
+            algorithm=algorithm,
+        )
     return encoded
 
 
 def decode_jwt(
     token: str | bytes,
-    public_key: str = settings.auth_jwt.public_key_path.read_text(),
+    public_key=_public_key,
     algorithm: str = settings.auth_jwt.algorithm,
 ):
-    decoded = jwt.decode(
-        token,
-        public_key,
-        algorithms=[algorithm],
-    )
+    with track_cpu("jwt_decode"):
+        decoded = jwt.decode(
+            token,
+            public_key,
+            algorithms=[algorithm],
+        )
     return decoded
 
 
-def hash_password(password: str) -> bytes:
-    salt = bcrypt.gensalt()
+def decode_jwt_cached(token: str | bytes) -> dict:
+    if isinstance(token, str):
+        token = token.encode()
+    digest = hashlib.sha256(token).digest()
+    payload = _verified_tokens.get(digest)
+    if payload is not None and payload["exp"] > time.time():
+        return payload
+
+    payload = decode_jwt(token=token)
+    ttl = min(payload["exp"] - time.time(), _verified_tokens.ttl_seconds)
+    if ttl > 0:
+        _verified_tokens.set(digest, payload, ttl_seconds=ttl)
+    return payload
+
+
+def hash_password(
+    password: str, rounds: int = settings.password_hashing.rounds
+) -> bytes:
+    salt = bcrypt.gensalt(rounds=rounds)
     pwd_bytes: bytes = password.encode()
     return bcrypt.hashpw(pwd_bytes, salt)
 
@@ -53,3 +92,7 @@ def validate_password(password: str, hashed_password: bytes) -> bool:
         password=password.encode(),
         hashed_password=hashed_password,
     )
+
+
+def password_hash_rounds(hashed_password: bytes) -> int:
+    return int(hashed_password.split(b"$")[2])
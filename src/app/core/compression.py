@@ -0,0 +1,70 @@
+import gzip
+import zlib
+from typing import AsyncIterator
+
+import zstandard
+
+CODECS = ("gzip", "zstd")
+
+
+def compress(data: bytes, codec: str, level: int | None = None) -> bytes:
+    if codec == "gzip":
+        return gzip.compress(data, compresslevel=level or 6, mtime=0)
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=level or 3).compress(data)
+    raise ValueError(f"unknown codec {codec!r}")
+
+
+def compressor(codec: str, level: int | None = None):
+    if codec == "gzip":
+        return zlib.compressobj(level or 6, wbits=31)
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=level or 3).compressobj()
+    raise ValueError(f"unknown codec {codec!r}")
+
+
+def decompress(data: bytes, codec: str) -> bytes:
+    decoder = _decompressor(codec)
+    return decoder.decompress(data) + decoder.flush()
+
+
+async def iter_decompressed(
+    chunks: AsyncIterator[bytes], codec: str
+) -> AsyncIterator[bytes]:
+    decoder = _decompressor(codec)
+    async for chunk in chunks:
+        data = decoder.decompress(chunk)
+        if data:
+            yield data
+    tail = decoder.flush()
+    if tail:
+        yield tail
+
+
+def accepts_encoding(accept_encoding: str | None, codec: str) -> bool:
+    if not accept_encoding:
+        return False
+    wildcard = False
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name == codec:
+            return quality > 0
+        if name == "*":
+            wildcard = quality > 0
+    return wildcard
+
+
+def _decompressor(codec: str):
+    if codec == "gzip":
+        return zlib.decompressobj(wbits=31)
+    if codec == "zstd":
+        return zstandard.ZstdDecompressor().decompressobj()
+    raise ValueError(f"unknown codec {codec!r}")
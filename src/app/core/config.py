@@ -14,10 +14,162 @@ class AuthJWT(BaseModel):
     algorithm: str = "RS256"
     access_token_expire_minutes: int = 15
     refresh_token_expire_days: int = 30
+    verified_cache_size: int = 10000
+    verified_cache_ttl_seconds: int = 300
+
+
+class ArticleCounters(BaseModel):
+    approximate: bool = False
+    cache_ttl_seconds: float = 5.0
+    reconcile_interval_seconds: int = 3600
+
+
+class S3(BaseModel):
+    endpoint_url: str = "http://minio:9000"
+    access_key: str = "minioadmin"
+    secret_key: str = "minioadmin"
+    bucket_name: str = "articles"
+    region_name: str = "us-east-1"
+    max_pool_connections: int = 50
+    connect_timeout: float = 2.0
+    read_timeout: float = 10.0
+    max_attempts: int = 3
+    retry_mode: str = "adaptive"
+    stream_chunk_size: int = 64 * 1024
+    compression: str | None = "zstd"
+    compression_level: int | None = None
+    compression_min_bytes: int = 512
+
+
+class Redis(BaseModel):
+    host: str = "redis"
+    port: int = 6379
+    db: int = 0
+    max_connections: int = 100
+    socket_timeout: float = 1.0
+
+    @property
+    def url(self):
+        return f"redis://{self.host}:{self.port}/{self.db}"
+
+
+class ContentCache(BaseModel):
+    enabled: bool = True
+    max_items: int = 1024
+    max_bytes: int = 64 * 1024 * 1024
+    max_item_bytes: int = 1024 * 1024
+    local_ttl_seconds: float = 30.0
+    redis_ttl_seconds: int = 3600
+
+
+class ContentDelivery(BaseModel):
+    mode: str = "proxy"
+    public_endpoint_url: str | None = None
+    presign_ttl_seconds: int = 300
+    url_cache_enabled: bool = True
+    url_cache_size: int = 10000
+    upload_ttl_seconds: int = 900
+    upload_max_bytes: int = 16 * 1024 * 1024
+
+
+class StreamingUpload(BaseModel):
+    part_size: int = 8 * 1024 * 1024
+    concurrency: int = 4
+    max_bytes: int = 1024 * 1024 * 1024
+    temp_prefix: str = "uploads/"
+    abandoned_after_seconds: int = 6 * 3600
+    sweep_interval_seconds: int = 900
+
+
+class SearchCache(BaseModel):
+    enabled: bool = True
+    ttl_seconds: int = 300
+
+
+class ArticleBlobs(BaseModel):
+    gc_interval_seconds: int = 300
+    gc_grace_seconds: int = 3600
+    gc_batch_size: int = 500
+
+
+class BulkIngest(BaseModel):
+    batch_size: int = 500
+    storage_concurrency: int = 32
+    max_line_bytes: int = 10 * 1024 * 1024
+    spool_memory_bytes: int = 8 * 1024 * 1024
+    read_chunk_bytes: int = 64 * 1024
+
+
+class PrincipalCache(BaseModel):
+    max_items: int = 10000
+    local_ttl_seconds: float = 30.0
+    redis_ttl_seconds: int = 300
+
+
+class PasswordHashing(BaseModel):
+    rounds: int = 12
+    executor: str = "thread"
+    max_workers: int = 4
+    max_queue: int = 64
+    retry_after_seconds: int = 1
+
+
+class Mail(BaseModel):
+    smtp_host: str = "smtp.gmail.com"
+    smtp_port: int = 587
+    smtp_timeout: float = 10.0
+    starttls: bool = True
+    sender: str | None = None
+    password: str | None = None
+    confirmation_url: str = "http://localhost:8000/confirm/{token}"
+    stream_key: str = "mail:stream"
+    consumer_group: str = "mail-workers"
+    dead_letter_key: str = "mail:dead"
+    retry_key: str = "mail:retry"
+    dead_letter_max_len: int = 10000
+    claim_idle_seconds: float = 300.0
+    batch_size: int = 50
+    max_attempts: int = 3
+    retry_base_seconds: float = 30.0
+    retry_max_seconds: float = 3600.0
+    idle_timeout_seconds: float = 60.0
+    run_worker: bool = True
+
+
+class Metrics(BaseModel):
+    enabled: bool = True
+    sql_statements: bool = True
+    route_cache_size: int = 1024
+
+
+class Profiling(BaseModel):
+    enabled: bool = False
+    token: str | None = None
+    header: str = "X-Profile-Token"
+    sample_rate: float = 0.0
+    interval_seconds: float = 0.001
+    report_format: str = "html"
+    storage_dir: Path = Path("/tmp/marketplace-profiles")
+    max_reports: int = 200
+    max_calls: int = 1000
 
 
 class Settings(BaseSettings):
     auth_jwt: AuthJWT = AuthJWT()
+    article_counters: ArticleCounters = ArticleCounters()
+    s3: S3 = S3()
+    redis: Redis = Redis()
+    content_cache: ContentCache = ContentCache()
+    search_cache: SearchCache = SearchCache()
+    content_delivery: ContentDelivery = ContentDelivery()
+    streaming_upload: StreamingUpload = StreamingUpload()
+    bulk_ingest: BulkIngest = BulkIngest()
+    article_blobs: ArticleBlobs = ArticleBlobs()
+    principal_cache: PrincipalCache = PrincipalCache()
+    password_hashing: PasswordHashing = PasswordHashing()
+    mail: Mail = Mail()
+    metrics: Metrics = Metrics()
+    profiling: Profiling = Profiling()
     timezone: str
     tz: ZoneInfo
     DB_HOST: str = "postgres"
@@ -26,12 +178,25 @@ class Settings(BaseSettings):
     DB_USER: str = "postgres"
     DB_PASS: str = "postgres"
     DB_echo: bool = False
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_COMMAND_TIMEOUT: float = 30.0
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    DB_PREPARED_STATEMENT_CACHE_SIZE: int = 100
+    DB_REPLICA_URLS: list[str] = []
+    DB_REPLICA_MAX_LAG_SECONDS: float = 10.0
+    DB_REPLICA_CHECK_INTERVAL: float = 5.0
+    DB_REPLICA_COOLDOWN_SECONDS: float = 10.0
+    DB_READ_YOUR_WRITES_SECONDS: float = 10.0
 
     @property
     def DATABASE_URL_asyncpg(self):
         return f"postgresql+asyncpg://{self.DB_USER}:{self.DB_PASS}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"  # noqa: 501
 
-    model_config = SettingsConfigDict(env_file=".env")
+    model_config = SettingsConfigDict(env_file=".env", env_nested_delimiter="__")
 
 
 settings = Settings(timezone=_project_timezone, tz=ZoneInfo(_project_timezone))
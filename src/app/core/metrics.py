@@ -0,0 +1,186 @@
+import re
+import time
+from contextlib import contextmanager
+
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.routing import Match
+
+from src.app.core.cache import LRUCache
+from src.app.core.profiling import record_call
+
+UNMATCHED_ROUTE = "<unmatched>"
+STATEMENT_KEYWORD = re.compile(r"\s*(\w+)")
+
+BYTES_BUCKETS = (
+    256,
+    1024,
+    4096,
+    16384,
+    65536,
+    262144,
+    1048576,
+    4194304,
+    16777216,
+    67108864,
+)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency, until the last body chunk is sent",
+    ["method", "route", "status"],
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "HTTP requests currently being served",
+    ["method", "route"],
+    multiprocess_mode="livesum",
+)
+DB_STATEMENT_SECONDS = Histogram(
+    "db_statement_duration_seconds",
+    "Database statement execution time",
+    ["database", "operation"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5),
+)
+DB_STATEMENT_ERRORS = Counter(
+    "db_statement_errors_total",
+    "Database statements that raised",
+    ["database", "operation"],
+)
+S3_OPERATION_SECONDS = Histogram(
+    "s3_operation_duration_seconds",
+    "Object storage call latency, until response headers are received",
+    ["operation"],
+)
+S3_OPERATION_BYTES = Histogram(
+    "s3_operation_bytes",
+    "Object sizes sent to or received from object storage",
+    ["operation"],
+    buckets=BYTES_BUCKETS,
+)
+S3_OPERATION_ERRORS = Counter(
+    "s3_operation_errors_total",
+    "Object storage calls that failed",
+    ["operation", "code"],
+)
+AUTH_CPU_SECONDS = Histogram(
+    "auth_cpu_seconds",
+    "CPU time spent signing and verifying JWTs and hashing passwords",
+    ["operation"],
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2),
+)
+
+
+class PrometheusMiddleware:
+    def __init__(self, app, route_cache_size: int = 1024):
+        self.app = app
+        self.routes = LRUCache(max_items=route_cache_size)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = self._route_template(scope)
+        in_flight = HTTP_REQUESTS_IN_FLIGHT.labels(method, route)
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUEST_SECONDS.labels(method, route, str(status_code)).observe(
+                time.perf_counter() - started
+            )
+            in_flight.dec()
+
+    def _route_template(self, scope) -> str:
+        key = (scope["method"], scope["path"])
+        template = self.routes.get(key)
+        if template is None:
+            template = self._match_route(scope)
+            if template != UNMATCHED_ROUTE:
+                self.routes.set(key, template)
+        return template
+
+    @staticmethod
+    def _match_route(scope) -> str:
+        for route in scope["app"].router.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return route.path
+        return UNMATCHED_ROUTE
+
+
+def instrument_engine(engine: AsyncEngine, database: str):
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, many):
+        conn.info.setdefault("statement_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, many):
+        started = conn.info["statement_started"].pop()
+        DB_STATEMENT_SECONDS.labels(database, statement_operation(statement)).observe(
+            time.perf_counter() - started
+        )
+
+    @event.listens_for(sync_engine, "handle_error")
+    def handle_error(context):
+        if context.connection is not None:
+            stack = context.connection.info.get("statement_started")
+            if stack:
+                stack.pop()
+        DB_STATEMENT_ERRORS.labels(
+            database, statement_operation(context.statement or "")
+        ).inc()
+
+
+def statement_operation(statement: str) -> str:
+    match = STATEMENT_KEYWORD.match(statement)
+    return match.group(1).upper() if match else "UNKNOWN"
+
+
+@contextmanager
+def track_s3(operation: str):
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        code = getattr(e, "response", {}).get("Error", {}).get("Code")
+        S3_OPERATION_ERRORS.labels(operation, code or type(e).__name__).inc()
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        S3_OPERATION_SECONDS.labels(operation).observe(elapsed)
+        record_call("s3", operation, started, elapsed)
+
+
+def observe_s3_bytes(operation: str, size: int | None):
+    if size is not None:
+        S3_OPERATION_BYTES.labels(operation).observe(size)
+
+
+@contextmanager
+def track_cpu(operation: str):
+    started = time.thread_time()
+    try:
+        yield
+    finally:
+        AUTH_CPU_SECONDS.labels(operation).observe(time.thread_time() - started)
+
+
+def cpu_timed(func, *args):
+    started = time.thread_time()
+    result = func(*args)
+    return result, time.thread_time() - started
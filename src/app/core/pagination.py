@@ -0,0 +1,23 @@
+import base64
+import binascii
+import json
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+def encode_cursor(data: dict) -> str:
+    raw = json.dumps(data, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        data = json.loads(base64.urlsafe_b64decode(padded))
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise InvalidCursorError(f"invalid cursor: {e}")
+    if not isinstance(data, dict):
+        raise InvalidCursorError("invalid cursor")
+    return data
@@ -0,0 +1,220 @@
+import asyncio
+import hmac
+import json
+import logging
+import random
+import re
+import time
+import uuid
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+from pyinstrument import Profiler
+from pyinstrument.renderers import SpeedscopeRenderer
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from src.app.core.config import settings
+
+REPORT_ID = re.compile(r"^[0-9a-f]{32}$")
+REPORT_FORMATS = {
+    "html": (".html", "text/html"),
+    "speedscope": (".speedscope.json", "application/json"),
+}
+PROFILE_ID_HEADER = b"x-profile-id"
+
+_current_trace: ContextVar[Optional["ProfileTrace"]] = ContextVar(
+    "profile_trace", default=None
+)
+
+
+@dataclass
+class ProfileTrace:
+    max_calls: int
+    started: float = field(default_factory=time.perf_counter)
+    calls: list[dict] = field(default_factory=list)
+    dropped_calls: int = 0
+
+    def add(self, kind: str, operation: str, started: float, duration: float):
+        if len(self.calls) >= self.max_calls:
+            self.dropped_calls += 1
+            return
+        self.calls.append(
+            {
+                "kind": kind,
+                "operation": operation,
+                "offset_ms": round((started - self.started) * 1000, 3),
+                "duration_ms": round(duration * 1000, 3),
+            }
+        )
+
+
+def record_call(kind: str, operation: str, started: float, duration: float):
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add(kind, operation, started, duration)
+
+
+def trace_engine(engine: AsyncEngine, database: str):
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, many):
+        if context is not None and _current_trace.get() is not None:
+            context._profile_started = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, many):
+        started = getattr(context, "_profile_started", None)
+        if started is not None:
+            record_call(
+                f"sql:{database}", statement, started, time.perf_counter() - started
+            )
+
+
+class ProfileStore:
+    def __init__(self, directory: Path, report_format: str, max_reports: int):
+        if report_format not in REPORT_FORMATS:
+            raise ValueError(f"unknown profile report format {report_format!r}")
+        self.directory = directory
+        self.report_format = report_format
+        self.max_reports = max_reports
+        self.suffix, self.media_type = REPORT_FORMATS[report_format]
+
+    def render(self, profiler: Profiler) -> str:
+        if self.report_format == "speedscope":
+            return profiler.output(renderer=SpeedscopeRenderer())
+        return profiler.output_html()
+
+    def save(self, report_id: str, report: str, meta: dict):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        (self.directory / f"{report_id}{self.suffix}").write_text(report)
+        (self.directory / f"{report_id}.meta.json").write_text(json.dumps(meta))
+        self._prune()
+
+    def list(self) -> list[dict]:
+        if not self.directory.exists():
+            return []
+        reports = []
+        for path in self.directory.glob("*.meta.json"):
+            meta = json.loads(path.read_text())
+            meta.pop("calls", None)
+            reports.append(meta)
+        return sorted(reports, key=lambda meta: meta["created_at"], reverse=True)
+
+    def meta(self, report_id: str) -> dict | None:
+        path = self._path(report_id, ".meta.json")
+        if path is None or not path.exists():
+            return None
+        return json.loads(path.read_text())
+
+    def report_path(self, report_id: str) -> Path | None:
+        path = self._path(report_id, self.suffix)
+        if path is None or not path.exists():
+            return None
+        return path
+
+    def _path(self, report_id: str, suffix: str) -> Path | None:
+        if not REPORT_ID.match(report_id):
+            return None
+        return self.directory / f"{report_id}{suffix}"
+
+    def _prune(self):
+        metas = sorted(
+            self.directory.glob("*.meta.json"), key=lambda path: path.stat().st_mtime
+        )
+        for path in metas[: max(len(metas) - self.max_reports, 0)]:
+            report_id = path.name.split(".", 1)[0]
+            for suffix, _ in REPORT_FORMATS.values():
+                (self.directory / f"{report_id}{suffix}").unlink(missing_ok=True)
+            path.unlink(missing_ok=True)
+
+
+class ProfilingMiddleware:
+    def __init__(
+        self,
+        app,
+        store: ProfileStore,
+        token: str | None,
+        header: str,
+        sample_rate: float,
+        interval_seconds: float,
+        max_calls: int,
+        exclude_prefixes: tuple[str, ...] = ("/profiles", "/metrics"),
+    ):
+        self.app = app
+        self.store = store
+        self.token = token.encode() if token else None
+        self.header = header.lower().encode()
+        self.sample_rate = sample_rate
+        self.interval_seconds = interval_seconds
+        self.max_calls = max_calls
+        self.exclude_prefixes = exclude_prefixes
+        self.logger = logging.getLogger(__name__)
+        self._active = False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        report_id = uuid.uuid4().hex
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (PROFILE_ID_HEADER, report_id.encode()),
+                ]
+            await send(message)
+
+        self._active = True
+        trace = ProfileTrace(max_calls=self.max_calls)
+        context_token = _current_trace.set(trace)
+        profiler = Profiler(interval=self.interval_seconds, async_mode="enabled")
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profiler.stop()
+            _current_trace.reset(context_token)
+            self._active = False
+            meta = {
+                "id": report_id,
+                "created_at": time.time(),
+                "method": scope["method"],
+                "path": scope["path"],
+                "status": status_code,
+                "duration_ms": round((time.perf_counter() - trace.started) * 1000, 3),
+                "format": self.store.report_format,
+                "dropped_calls": trace.dropped_calls,
+                "calls": trace.calls,
+            }
+            try:
+                await asyncio.to_thread(self._store_report, report_id, profiler, meta)
+            except Exception as e:
+                self.logger.warning(f"Failed to store profile {report_id}: {e}")
+
+    def _should_profile(self, scope) -> bool:
+        if self._active or scope["path"].startswith(self.exclude_prefixes):
+            return False
+        if self.token is not None:
+            for name, value in scope["headers"]:
+                if name == self.header and hmac.compare_digest(value, self.token):
+                    return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def _store_report(self, report_id: str, profiler: Profiler, meta: dict):
+        self.store.save(report_id, self.store.render(profiler), meta)
+
+
+profile_store = ProfileStore(
+    directory=settings.profiling.storage_dir,
+    report_format=settings.profiling.report_format,
+    max_reports=settings.profiling.max_reports,
+)
@@ -1,40 +1,259 @@
+import asyncio
+import itertools
+import logging
+import time
 from asyncio import current_task
+from dataclasses import dataclass
 
+from fastapi import Request, Response
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
     AsyncSession,
     async_scoped_session,
     async_sessionmaker,
     create_async_engine,
 )
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from src.app.core.config import settings
+from src.app.core.metrics import instrument_engine
+from src.app.core.profiling import trace_engine
+
+PRIMARY_COOKIE = "db_primary_until"
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.timeouts = 0
+
+    def _do_get(self):
+        saturated = (
+            self._max_overflow > -1
+            and self.checkedout() >= self.size() + self._max_overflow
+        )
+        if not saturated:
+            return super()._do_get()
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            self.waits += 1
+            self.wait_seconds += time.perf_counter() - started
+
+
+@dataclass
+class Replica:
+    engine: AsyncEngine
+    session_factory: async_sessionmaker[AsyncSession]
+    unavailable_until: float = 0.0
+    lag_seconds: float | None = None
+
+    @property
+    def available(self) -> bool:
+        return self.unavailable_until <= time.monotonic()
 
 
 class DB_halper:
-    def __init__(self, db_url: str):
-        self.engine = create_async_engine(
-            url=db_url,
-            echo=True,
-            pool_size=10,
-            max_overflow=10,
+    def __init__(
+        self,
+        db_url: str,
+        echo: bool = False,
+        pool_size: int = 10,
+        max_overflow: int = 10,
+        pool_timeout: float = 30.0,
+        pool_recycle: int = -1,
+        pool_pre_ping: bool = False,
+        command_timeout: float | None = None,
+        statement_cache_size: int = 100,
+        prepared_statement_cache_size: int = 100,
+        replica_urls: list[str] | None = None,
+        replica_max_lag_seconds: float = 10.0,
+        replica_cooldown_seconds: float = 10.0,
+        read_your_writes_seconds: float = 10.0,
+        instrument_statements: bool = False,
+        trace_statements: bool = False,
+    ):
+        self.engine_options = {
+            "echo": echo,
+            "poolclass": InstrumentedQueuePool,
+            "pool_size": pool_size,
+            "max_overflow": max_overflow,
+            "pool_timeout": pool_timeout,
+            "pool_recycle": pool_recycle,
+            "pool_pre_ping": pool_pre_ping,
+            "connect_args": {
+                "command_timeout": command_timeout,
+                "statement_cache_size": statement_cache_size,
+                "prepared_statement_cache_size": prepared_statement_cache_size,
+            },
+        }
+        self.engine = create_async_engine(url=db_url, **self.engine_options)
+        if instrument_statements:
+            instrument_engine(self.engine, "primary")
+        if trace_statements:
+            trace_engine(self.engine, "primary")
+        self.session_factory = self._make_session_factory(self.engine)
+        self.scoped_session = async_scoped_session(
+            session_factory=self.session_factory, scopefunc=current_task
         )
-        self.session_factory = async_sessionmaker(
-            bind=self.engine,
+        self.replicas = []
+        for url in replica_urls or []:
+            engine = create_async_engine(url=url, **self.engine_options)
+            if instrument_statements:
+                instrument_engine(engine, "replica")
+            if trace_statements:
+                trace_engine(engine, "replica")
+            self.replicas.append(Replica(engine, self._make_session_factory(engine)))
+        self.replica_max_lag_seconds = replica_max_lag_seconds
+        self.replica_cooldown_seconds = replica_cooldown_seconds
+        self.read_your_writes_seconds = read_your_writes_seconds
+        self.logger = logging.getLogger(__name__)
+        self._next_replica = itertools.count()
+
+    @staticmethod
+    def _make_session_factory(engine: AsyncEngine) -> async_sessionmaker:
+        return async_sessionmaker(
+            bind=engine,
             autoflush=False,
             autocommit=False,
             expire_on_commit=False,
         )
 
-    def get_scoped_session(self):
-        session = async_scoped_session(
-            session_factory=self.session_factory, scopefunc=current_task
+    async def session_dependency(self) -> AsyncSession:
+        session = self.scoped_session()
+        try:
+            yield session
+        finally:
+            await self.scoped_session.remove()
+
+    async def read_session_dependency(self, request: Request) -> AsyncSession:
+        replica = None
+        if not self._wants_primary(request):
+            replica = self._pick_replica()
+        if replica is None:
+            async with self.session_factory() as session:
+                yield session
+            return
+
+        async with replica.session_factory() as session:
+            try:
+                yield session
+            except (DBAPIError, OSError, PoolTimeoutError) as e:
+                self._mark_unavailable(replica, e)
+                raise
+
+    def mark_write(self, response: Response):
+        if self.replicas:
+            until = time.time() + self.read_your_writes_seconds
+            response.set_cookie(
+                PRIMARY_COOKIE,
+                f"{until:.3f}",
+                max_age=int(self.read_your_writes_seconds) + 1,
+                httponly=True,
+            )
+
+    async def monitor_replicas(self, interval: float):
+        while True:
+            for replica in self.replicas:
+                await self._check_replica(replica)
+            await asyncio.sleep(interval)
+
+    def pool_stats(self) -> dict:
+        stats = self._engine_pool_stats(self.engine)
+        if self.replicas:
+            stats["replicas"] = [
+                {
+                    "available": replica.available,
+                    "lag_seconds": replica.lag_seconds,
+                    **self._engine_pool_stats(replica.engine),
+                }
+                for replica in self.replicas
+            ]
+        return stats
+
+    async def dispose(self):
+        await self.engine.dispose()
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+    @staticmethod
+    def _engine_pool_stats(engine: AsyncEngine) -> dict:
+        pool = engine.pool
+        return {
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "waits": pool.waits,
+            "wait_seconds": pool.wait_seconds,
+            "timeouts": pool.timeouts,
+        }
+
+    def _wants_primary(self, request: Request) -> bool:
+        until = request.cookies.get(PRIMARY_COOKIE)
+        try:
+            return until is not None and float(until) > time.time()
+        except ValueError:
+            return False
+
+    def _pick_replica(self) -> Replica | None:
+        for _ in range(len(self.replicas)):
+            replica = self.replicas[next(self._next_replica) % len(self.replicas)]
+            if replica.available:
+                return replica
+        return None
+
+    def _mark_unavailable(self, replica: Replica, reason):
+        replica.unavailable_until = time.monotonic() + self.replica_cooldown_seconds
+        self.logger.warning(
+            f"Read replica {replica.engine.url!r} unavailable: {reason}"
         )
-        return session
 
-    async def session_dependency(self) -> AsyncSession:
-        session = self.get_scoped_session()
-        yield session
-        await session.close()
+    async def _check_replica(self, replica: Replica):
+        try:
+            async with replica.engine.connect() as conn:
+                lag = await conn.scalar(
+                    text(
+                        "SELECT CASE WHEN pg_last_wal_receive_lsn() "
+                        "= pg_last_wal_replay_lsn() THEN 0 "
+                        "ELSE COALESCE(EXTRACT(EPOCH FROM "
+                        "now() - pg_last_xact_replay_timestamp()), 0) END"
+                    )
+                )
+        except (DBAPIError, OSError, PoolTimeoutError) as e:
+            self._mark_unavailable(replica, e)
+            return
+        replica.lag_seconds = float(lag)
+        if replica.lag_seconds > self.replica_max_lag_seconds:
+            self._mark_unavailable(replica, f"lag {replica.lag_seconds:.1f}s")
+        else:
+            replica.unavailable_until = 0.0
 
 
-db_helper = DB_halper(db_url=settings.DATABASE_URL_asyncpg)
+db_helper = DB_halper(
+    db_url=settings.DATABASE_URL_asyncpg,
+    echo=settings.DB_echo,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+    command_timeout=settings.DB_COMMAND_TIMEOUT,
+    statement_cache_size=settings.DB_STATEMENT_CACHE_SIZE,
+    prepared_statement_cache_size=settings.DB_PREPARED_STATEMENT_CACHE_SIZE,
+    replica_urls=settings.DB_REPLICA_URLS,
+    replica_max_lag_seconds=settings.DB_REPLICA_MAX_LAG_SECONDS,
+    replica_cooldown_seconds=settings.DB_REPLICA_COOLDOWN_SECONDS,
+    read_your_writes_seconds=settings.DB_READ_YOUR_WRITES_SECONDS,
+    instrument_statements=settings.metrics.enabled and settings.metrics.sql_statements,
+    trace_statements=settings.profiling.enabled,
+)
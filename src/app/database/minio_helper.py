@@ -1,38 +1,225 @@
+import asyncio
+import base64
+import hashlib
 import logging
-from typing import Optional
+import re
+from contextlib import AsyncExitStack
+from dataclasses import dataclass
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from typing import AsyncIterator, Optional
 
-import boto3
+from aiobotocore.config import AioConfig
+from aiobotocore.session import get_session
 from botocore.exceptions import ClientError
 
+from src.app.core.cache import LRUCache
+from src.app.core.compression import (
+    CODECS,
+    accepts_encoding,
+    compress,
+    decompress,
+    iter_decompressed,
+)
+from src.app.core.config import settings
+from src.app.core.metrics import observe_s3_bytes, track_s3
+
+SINGLE_BYTE_RANGE = re.compile(r"^bytes=(\d+-\d*|-\d+)$")
+CONTENT_KEY = re.compile(r"^articles/([0-9a-f]{64})\.txt$")
+UNCOMPRESSED_LENGTH = "uncompressed-length"
+COMPRESS_IN_THREAD_BYTES = 256 * 1024
+
+
+class InvalidRangeError(ValueError):
+    def __init__(self, message: str, total: int | None = None):
+        super().__init__(message)
+        self.total = total
+
+
+def content_key(body: bytes) -> str:
+    return digest_key(hashlib.sha256(body).hexdigest())
+
+
+def digest_key(digest: str) -> str:
+    return f"articles/{digest}.txt"
+
+
+def content_digest(key: str) -> str | None:
+    match = CONTENT_KEY.match(key)
+    return match.group(1) if match else None
+
+
+def representation_etag(digest: str, content_encoding: str | None) -> str:
+    if content_encoding:
+        return f'"{digest}.{content_encoding}"'
+    return f'"{digest}"'
+
+
+def matching_etag(
+    if_none_match: str, digest: str, accept_encoding: str | None
+) -> str | None:
+    for tag in if_none_match.split(","):
+        tag = tag.strip().removeprefix("W/")
+        if tag == representation_etag(digest, None):
+            return tag
+        prefix = f'"{digest}.'
+        if tag.startswith(prefix) and tag.endswith('"'):
+            codec = tag[len(prefix) : -1]
+            if codec in CODECS and accepts_encoding(accept_encoding, codec):
+                return tag
+    return None
+
+
+@dataclass
+class StoredObject:
+    body: AsyncIterator[bytes]
+    content_length: int | None
+    content_type: str
+    etag: str | None = None
+    last_modified: datetime | None = None
+    content_range: str | None = None
+    content_encoding: str | None = None
+    uncompressed_length: int | None = None
+    immutable: bool = False
+
+    @property
+    def partial(self) -> bool:
+        return self.content_range is not None
+
+    def negotiate(self, accept_encoding: str | None) -> "StoredObject":
+        if self.content_encoding is None or accepts_encoding(
+            accept_encoding, self.content_encoding
+        ):
+            return self
+        etag = self.etag
+        if etag and not etag.startswith("W/"):
+            etag = f"W/{etag}"
+        return StoredObject(
+            body=iter_decompressed(self.body, self.content_encoding),
+            content_length=self.uncompressed_length,
+            content_type=self.content_type,
+            etag=etag,
+            last_modified=self.last_modified,
+        )
+
 
 class S3Repository:
     def __init__(
-        self, endpoint_url: str, access_key: str, secret_key: str, bucket_name: str
+        self,
+        endpoint_url: str,
+        access_key: str,
+        secret_key: str,
+        bucket_name: str,
+        region_name: str = "us-east-1",
+        config: AioConfig | None = None,
+        compression: str | None = None,
+        compression_level: int | None = None,
+        compression_min_bytes: int = 0,
+        public_endpoint_url: str | None = None,
+        presigned_urls: LRUCache | None = None,
+        content_encodings: LRUCache | None = None,
     ):
-        self.s3_client = boto3.client(
+        if compression is not None and compression not in CODECS:
+            raise ValueError(f"unknown compression codec {compression!r}")
+        self.endpoint_url = endpoint_url
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.bucket_name = bucket_name
+        self.region_name = region_name
+        self.config = config
+        self.compression = compression
+        self.compression_level = compression_level
+        self.compression_min_bytes = compression_min_bytes
+        self.public_endpoint_url = public_endpoint_url
+        self.presigned_urls = presigned_urls
+        self.content_encodings = content_encodings
+        self.session = get_session()
+        self.logger = logging.getLogger(__name__)
+        self._exit_stack: AsyncExitStack | None = None
+        self._client = None
+        self._presign_client = None
+
+    @property
+    def s3_client(self):
+        if self._client is None:
+            raise RuntimeError("S3 client is not started")
+        return self._client
+
+    @property
+    def presign_client(self):
+        return self._presign_client or self.s3_client
+
+    async def start(self):
+        if self._client is not None:
+            return
+        self._exit_stack = AsyncExitStack()
+        self._client = await self._exit_stack.enter_async_context(
+            self._create_client(self.endpoint_url)
+        )
+        if self.public_endpoint_url:
+            self._presign_client = await self._exit_stack.enter_async_context(
+                self._create_client(self.public_endpoint_url)
+            )
+        await self.ensure_bucket()
+
+    def _create_client(self, endpoint_url: str):
+        return self.session.create_client(
             "s3",
             endpoint_url=endpoint_url,
-            aws_access_key_id=access_key,
-            aws_secret_access_key=secret_key,
+            aws_access_key_id=self.access_key,
+            aws_secret_access_key=self.secret_key,
+            region_name=self.region_name,
+            config=self.config,
         )
-        self.bucket_name = bucket_name
-        self.logger = logging.getLogger(__name__)
 
-    def upload_article(self, article_id: int, content: str) -> str:
-        key = f"articles/{article_id}.txt"
+    async def close(self):
+        if self._exit_stack is not None:
+            await self._exit_stack.aclose()
+        self._exit_stack = None
+        self._client = None
+        self._presign_client = None
+
+    async def ensure_bucket(self):
+        try:
+            await self.s3_client.head_bucket(Bucket=self.bucket_name)
+        except ClientError:
+            await self.s3_client.create_bucket(Bucket=self.bucket_name)
+            self.logger.info(f"Bucket {self.bucket_name} created")
+
+    async def upload_article(self, key: str, body: bytes) -> str:
+        params = {
+            "Bucket": self.bucket_name,
+            "Key": key,
+            "ContentType": "text/plain; charset=utf-8",
+            "Metadata": {UNCOMPRESSED_LENGTH: str(len(body))},
+        }
+        if self.compression and len(body) >= self.compression_min_bytes:
+            body = await self._compress(body)
+            params["ContentEncoding"] = self.compression
         try:
-            self.s3_client.put_object(Bucket=self.bucket_name, Key=key, Body=content)
-            self.logger.info(f"Article {article_id} uploaded to {key}")
+            with track_s3("put_object"):
+                await self.s3_client.put_object(Body=body, **params)
+            observe_s3_bytes("put_object", len(body))
+            self.logger.info(f"Article uploaded to {key}")
             return key
         except ClientError as e:
-            self.logger.error(f"Failed to upload article {article_id}: {e}")
+            self.logger.error(f"Failed to upload article {key}: {e}")
             raise RuntimeError(f"Failed to upload article: {e}")
 
-    def get_article(self, key: str) -> Optional[str]:
+    async def get_article(self, key: str) -> Optional[str]:
         try:
-            response = self.s3_client.get_object(Bucket=self.bucket_name, Key=key)
+            with track_s3("get_object"):
+                response = await self.s3_client.get_object(
+                    Bucket=self.bucket_name, Key=key
+                )
+                async with response["Body"] as stream:
+                    data = await stream.read()
+            observe_s3_bytes("get_object", len(data))
             self.logger.info(f"Article fetched from {key}")
-            return response["Body"].read().decode("utf-8")
+            codec = self._codec(response)
+            if codec:
+                data = decompress(data, codec)
+            return data.decode("utf-8")
         except ClientError as e:
             if e.response["Error"]["Code"] == "NoSuchKey":
                 self.logger.warning(f"Article not found: {key}")
@@ -40,10 +227,385 @@ class S3Repository:
             self.logger.error(f"Failed to get article {key}: {e}")
             raise RuntimeError(f"Failed to get article: {e}")
 
-    def delete_article(self, key: str):
+    async def open_article(
+        self,
+        key: str,
+        byte_range: str | None = None,
+        if_range: str | None = None,
+        chunk_size: int = settings.s3.stream_chunk_size,
+        accept_encoding: str | None = None,
+    ) -> Optional[StoredObject]:
+        params = {"Bucket": self.bucket_name, "Key": key}
+        if byte_range and SINGLE_BYTE_RANGE.match(byte_range.strip()):
+            params["Range"] = byte_range.strip()
+            if if_range:
+                if if_range.startswith("W/"):
+                    params.pop("Range")
+                elif if_range.startswith('"'):
+                    params["IfMatch"] = if_range
+                else:
+                    try:
+                        params["IfUnmodifiedSince"] = parsedate_to_datetime(if_range)
+                    except (TypeError, ValueError):
+                        params.pop("Range")
         try:
-            self.s3_client.delete_object(Bucket=self.bucket_name, Key=key)
+            response = await self._get_object(params)
+        except ClientError as e:
+            code = e.response["Error"]["Code"]
+            if code == "NoSuchKey":
+                self.logger.warning(f"Article not found: {key}")
+                return None
+            if code == "InvalidRange":
+                total = e.response["Error"].get("ActualObjectSize")
+                if total is None:
+                    head = await self.head_article(key)
+                    total = head["ContentLength"] if head else None
+                raise InvalidRangeError(
+                    f"Range not satisfiable: {byte_range}",
+                    total=int(total) if total is not None else None,
+                )
+            self.logger.error(f"Failed to get article {key}: {e}")
+            raise RuntimeError(f"Failed to get article: {e}")
+
+        codec = self._codec(response)
+        if (
+            codec
+            and response.get("ContentRange")
+            and not accepts_encoding(accept_encoding, codec)
+        ):
+            response["Body"].close()
+            response = await self._get_object({"Bucket": self.bucket_name, "Key": key})
+
+        observe_s3_bytes("get_object", response["ContentLength"])
+        self.logger.info(f"Article stream opened from {key}")
+        uncompressed_length = response.get("Metadata", {}).get(UNCOMPRESSED_LENGTH)
+        stored = StoredObject(
+            body=self._iter_body(response["Body"], chunk_size),
+            content_length=response["ContentLength"],
+            content_type=response.get("ContentType") or "text/plain; charset=utf-8",
+            etag=response.get("ETag"),
+            last_modified=response.get("LastModified"),
+            content_range=response.get("ContentRange"),
+            content_encoding=codec,
+            uncompressed_length=(
+                int(uncompressed_length) if uncompressed_length else None
+            ),
+        )
+        return stored.negotiate(accept_encoding)
+
+    async def _compress(self, body: bytes) -> bytes:
+        if len(body) >= COMPRESS_IN_THREAD_BYTES:
+            return await asyncio.to_thread(
+                compress, body, self.compression, self.compression_level
+            )
+        return compress(body, self.compression, self.compression_level)
+
+    @staticmethod
+    def _codec(response: dict) -> str | None:
+        codec = response.get("ContentEncoding")
+        return codec if codec in CODECS else None
+
+    async def _get_object(self, params: dict):
+        try:
+            with track_s3("get_object"):
+                return await self.s3_client.get_object(**params)
+        except ClientError as e:
+            if "Range" not in params or e.response["Error"]["Code"] not in (
+                "PreconditionFailed",
+                "412",
+            ):
+                raise
+        params = {"Bucket": params["Bucket"], "Key": params["Key"]}
+        with track_s3("get_object"):
+            return await self.s3_client.get_object(**params)
+
+    @staticmethod
+    async def _iter_body(body, chunk_size: int) -> AsyncIterator[bytes]:
+        async with body as stream:
+            async for chunk in stream.iter_chunks(chunk_size):
+                yield chunk
+
+    async def upload_article_multipart(
+        self,
+        key: str,
+        chunks: AsyncIterator[bytes],
+        part_size: int,
+        concurrency: int,
+        content_encoding: str | None = None,
+    ) -> int:
+        params = {
+            "Bucket": self.bucket_name,
+            "Key": key,
+            "ContentType": "text/plain; charset=utf-8",
+        }
+        if content_encoding:
+            params["ContentEncoding"] = content_encoding
+        try:
+            with track_s3("create_multipart_upload"):
+                created = await self.s3_client.create_multipart_upload(**params)
+        except ClientError as e:
+            self.logger.error(f"Failed to start multipart upload {key}: {e}")
+            raise RuntimeError(f"Failed to upload article: {e}")
+        upload_id = created["UploadId"]
+
+        semaphore = asyncio.Semaphore(concurrency)
+        tasks: list[asyncio.Task] = []
+
+        async def send(part_number: int, part: bytes) -> dict:
+            try:
+                with track_s3("upload_part"):
+                    response = await self.s3_client.upload_part(
+                        Bucket=self.bucket_name,
+                        Key=key,
+                        UploadId=upload_id,
+                        PartNumber=part_number,
+                        Body=part,
+                    )
+                observe_s3_bytes("upload_part", len(part))
+                return {"PartNumber": part_number, "ETag": response["ETag"]}
+            finally:
+                semaphore.release()
+
+        size = 0
+        try:
+            part_number = 0
+            async for part in iter_parts(chunks, part_size):
+                await semaphore.acquire()
+                for task in tasks:
+                    if task.done() and task.exception() is not None:
+                        raise task.exception()
+                part_number += 1
+                size += len(part)
+                tasks.append(asyncio.create_task(send(part_number, part)))
+            parts = await asyncio.gather(*tasks)
+            with track_s3("complete_multipart_upload"):
+                await self.s3_client.complete_multipart_upload(
+                    Bucket=self.bucket_name,
+                    Key=key,
+                    UploadId=upload_id,
+                    MultipartUpload={"Parts": parts},
+                )
+        except BaseException as e:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await asyncio.shield(self.abort_multipart_upload(key, upload_id))
+            if isinstance(e, ClientError):
+                self.logger.error(f"Failed to upload article {key}: {e}")
+                raise RuntimeError(f"Failed to upload article: {e}")
+            raise
+        self.logger.info(f"Article uploaded to {key} in {part_number} parts")
+        return size
+
+    async def abort_multipart_upload(self, key: str, upload_id: str):
+        try:
+            with track_s3("abort_multipart_upload"):
+                await self.s3_client.abort_multipart_upload(
+                    Bucket=self.bucket_name, Key=key, UploadId=upload_id
+                )
+            self.logger.info(f"Multipart upload {upload_id} to {key} aborted")
+        except ClientError as e:
+            self.logger.warning(f"Failed to abort multipart upload {key}: {e}")
+
+    async def abort_stale_multipart_uploads(
+        self, prefix: str, initiated_before: datetime
+    ) -> int:
+        aborted = 0
+        paginator = self.s3_client.get_paginator("list_multipart_uploads")
+        async for page in paginator.paginate(Bucket=self.bucket_name, Prefix=prefix):
+            for upload in page.get("Uploads", []):
+                if upload["Initiated"] < initiated_before:
+                    await self.abort_multipart_upload(upload["Key"], upload["UploadId"])
+                    aborted += 1
+        return aborted
+
+    async def list_stale_articles(
+        self, prefix: str, modified_before: datetime
+    ) -> list[str]:
+        keys = []
+        paginator = self.s3_client.get_paginator("list_objects_v2")
+        async for page in paginator.paginate(Bucket=self.bucket_name, Prefix=prefix):
+            for item in page.get("Contents", []):
+                if item["LastModified"] < modified_before:
+                    keys.append(item["Key"])
+        return keys
+
+    async def copy_article(
+        self,
+        source_key: str,
+        key: str,
+        uncompressed_length: int,
+        content_encoding: str | None = None,
+    ):
+        params = {
+            "Bucket": self.bucket_name,
+            "Key": key,
+            "CopySource": {"Bucket": self.bucket_name, "Key": source_key},
+            "MetadataDirective": "REPLACE",
+            "ContentType": "text/plain; charset=utf-8",
+            "Metadata": {UNCOMPRESSED_LENGTH: str(uncompressed_length)},
+        }
+        if content_encoding:
+            params["ContentEncoding"] = content_encoding
+        try:
+            with track_s3("copy_object"):
+                await self.s3_client.copy_object(**params)
+            self.logger.info(f"Article copied from {source_key} to {key}")
+        except ClientError as e:
+            self.logger.error(f"Failed to copy article {source_key}: {e}")
+            raise RuntimeError(f"Failed to copy article: {e}")
+
+    async def presign_get(
+        self, key: str, ttl_seconds: int, cache_control: str | None = None
+    ) -> str:
+        if self.presigned_urls is not None:
+            url = self.presigned_urls.get((key, cache_control))
+            if url is not None:
+                return url
+        params = {"Bucket": self.bucket_name, "Key": key}
+        if cache_control:
+            params["ResponseCacheControl"] = cache_control
+        url = await self.presign_client.generate_presigned_url(
+            "get_object", Params=params, ExpiresIn=ttl_seconds
+        )
+        if self.presigned_urls is not None:
+            self.presigned_urls.set(
+                (key, cache_control), url, ttl_seconds=ttl_seconds / 2
+            )
+        return url
+
+    async def presign_put(
+        self, key: str, size: int, sha256: str, ttl_seconds: int
+    ) -> tuple[str, dict[str, str]]:
+        checksum = base64.b64encode(bytes.fromhex(sha256)).decode()
+        headers = {
+            "Content-Length": str(size),
+            "Content-Type": "text/plain; charset=utf-8",
+            "x-amz-checksum-sha256": checksum,
+            "x-amz-meta-" + UNCOMPRESSED_LENGTH: str(size),
+        }
+        url = await self.presign_client.generate_presigned_url(
+            "put_object",
+            Params={
+                "Bucket": self.bucket_name,
+                "Key": key,
+                "ContentLength": size,
+                "ContentType": headers["Content-Type"],
+                "ChecksumSHA256": checksum,
+                "Metadata": {UNCOMPRESSED_LENGTH: str(size)},
+            },
+            ExpiresIn=ttl_seconds,
+        )
+        return url, headers
+
+    async def head_article(self, key: str) -> Optional[dict]:
+        try:
+            with track_s3("head_object"):
+                return await self.s3_client.head_object(
+                    Bucket=self.bucket_name, Key=key, ChecksumMode="ENABLED"
+                )
+        except ClientError as e:
+            if e.response["Error"]["Code"] in ("404", "NoSuchKey", "NotFound"):
+                return None
+            self.logger.error(f"Failed to head article {key}: {e}")
+            raise RuntimeError(f"Failed to head article: {e}")
+
+    async def article_encoding(self, key: str) -> Optional[str]:
+        cache = self.content_encodings if content_digest(key) else None
+        if cache is not None:
+            codec = cache.get(key)
+            if codec is not None:
+                return codec or None
+        response = await self.head_article(key)
+        if response is None:
+            return None
+        codec = self._codec(response)
+        if cache is not None:
+            cache.set(key, codec or "")
+        return codec
+
+    async def article_sha256(self, key: str) -> Optional[str]:
+        stored = await self.open_article(key)
+        if stored is None:
+            return None
+        digest = hashlib.sha256()
+        async for chunk in stored.body:
+            digest.update(chunk)
+        return digest.hexdigest()
+
+    async def delete_article(self, key: str):
+        try:
+            with track_s3("delete_object"):
+                await self.s3_client.delete_object(Bucket=self.bucket_name, Key=key)
             self.logger.info(f"Article deleted from {key}")
         except ClientError as e:
             self.logger.error(f"Failed to delete article {key}: {e}")
             raise RuntimeError(f"Failed to delete article: {e}")
+
+    async def delete_articles(self, keys: list[str]):
+        for offset in range(0, len(keys), 1000):
+            batch = keys[offset : offset + 1000]
+            try:
+                with track_s3("delete_objects"):
+                    response = await self.s3_client.delete_objects(
+                        Bucket=self.bucket_name,
+                        Delete={
+                            "Objects": [{"Key": key} for key in batch],
+                            "Quiet": True,
+                        },
+                    )
+            except ClientError as e:
+                self.logger.error(f"Failed to delete {len(batch)} articles: {e}")
+                raise RuntimeError(f"Failed to delete articles: {e}")
+            errors = response.get("Errors", [])
+            if errors:
+                raise RuntimeError(
+                    f"Failed to delete {len(errors)} articles: "
+                    f"{errors[0].get('Key')}: {errors[0].get('Message')}"
+                )
+            self.logger.info(f"Deleted {len(batch)} articles")
+
+
+async def iter_parts(
+    chunks: AsyncIterator[bytes], part_size: int
+) -> AsyncIterator[bytes]:
+    buffer = bytearray()
+    async for chunk in chunks:
+        buffer += chunk
+        while len(buffer) >= part_size:
+            yield bytes(buffer[:part_size])
+            del buffer[:part_size]
+    if buffer:
+        yield bytes(buffer)
+
+
+s3_helper = S3Repository(
+    endpoint_url=settings.s3.endpoint_url,
+    access_key=settings.s3.access_key,
+    secret_key=settings.s3.secret_key,
+    bucket_name=settings.s3.bucket_name,
+    region_name=settings.s3.region_name,
+    config=AioConfig(
+        max_pool_connections=settings.s3.max_pool_connections,
+        connect_timeout=settings.s3.connect_timeout,
+        read_timeout=settings.s3.read_timeout,
+        retries={
+            "max_attempts": settings.s3.max_attempts,
+            "mode": settings.s3.retry_mode,
+        },
+    ),
+    compression=settings.s3.compression,
+    compression_level=settings.s3.compression_level,
+    compression_min_bytes=settings.s3.compression_min_bytes,
+    public_endpoint_url=settings.content_delivery.public_endpoint_url,
+    presigned_urls=(
+        LRUCache(max_items=settings.content_delivery.url_cache_size)
+        if settings.content_delivery.url_cache_enabled
+        else None
+    ),
+    content_encodings=(
+        LRUCache(max_items=settings.content_delivery.url_cache_size)
+        if settings.content_delivery.url_cache_enabled
+        else None
+    ),
+)
@@ -1,7 +1,17 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import DateTime, ForeignKey, func
+from sqlalchemy import (
+    DDL,
+    BigInteger,
+    Computed,
+    DateTime,
+    ForeignKey,
+    Index,
+    event,
+    func,
+    text,
+)
 from sqlalchemy.dialects.postgresql import TSVECTOR, UUID
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
@@ -16,9 +26,9 @@ class Base(DeclarativeBase):
 class UserModel(Base):
     __tablename__ = "users"
     user_id = mapped_column(UUID(as_uuid=True), default=uuid.uuid4)
-    username: Mapped[str] = mapped_column(nullable=False)
+    username: Mapped[str] = mapped_column(nullable=False, unique=True)
     password: Mapped[bytes] = mapped_column(nullable=False)
-    email: Mapped[str] = mapped_column(nullable=False)
+    email: Mapped[str] = mapped_column(nullable=False, unique=True)
     active: Mapped[bool] = mapped_column(nullable=True)
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=settings.timezone), server_default=func.now()
@@ -30,12 +40,25 @@ class UserModel(Base):
 
 class CategoryArticleModel(Base):
     __tablename__ = "categories_articles"
+    __table_args__ = (
+        Index("ix_categories_articles_category_article", "category_id", "article_id"),
+        Index("ix_categories_articles_article", "article_id"),
+        Index(
+            "ix_categories_articles_random_key",
+            "category_id",
+            "random_key",
+            "article_id",
+        ),
+    )
     category_id: Mapped[int] = mapped_column(
         ForeignKey("categories.id", ondelete="CASCADE"), primary_key=True
     )
     article_id: Mapped[int] = mapped_column(
         ForeignKey("articles.id", ondelete="CASCADE"), primary_key=True
     )
+    random_key: Mapped[float] = mapped_column(
+        server_default=func.random(), nullable=False
+    )
 
 
 class CategoriesModel(Base):
@@ -48,18 +71,188 @@ class CategoriesModel(Base):
 
 class ArticleModel(Base):
     __tablename__ = "articles"
+    __table_args__ = (
+        Index("ix_articles_random_key", "random_key", "id"),
+        Index("ix_articles_search_vector", "search_vector", postgresql_using="gin"),
+    )
     title: Mapped[str] = mapped_column(nullable=False)
     short_description: Mapped[str] = mapped_column(nullable=False)
     link_body: Mapped[str] = mapped_column(nullable=False)
     s3_key: Mapped[str] = mapped_column(nullable=False)
-    author: Mapped[str] = mapped_column(nullable=False)
+    author: Mapped[str] = mapped_column(nullable=False, index=True)
     created_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=settings.timezone), server_default=func.now()
+        DateTime(timezone=settings.timezone), server_default=func.now(), index=True
     )
     updated_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=settings.timezone), onupdate=func.now(), nullable=True
     )
-    search_vector = mapped_column(TSVECTOR, nullable=True)
+    search_vector = mapped_column(
+        TSVECTOR,
+        Computed(
+            "to_tsvector('russian', coalesce(title, '') || ' ' || "
+            "coalesce(short_description, ''))",
+            persisted=True,
+        ),
+    )
+    random_key: Mapped[float] = mapped_column(
+        server_default=func.random(), nullable=False
+    )
     categories = relationship(
         "CategoriesModel", secondary="categories_articles", back_populates="articles"
     )
+
+
+class ArticleCounterModel(Base):
+    __tablename__ = "article_counters"
+    category_id: Mapped[int] = mapped_column(unique=True, nullable=False)
+    articles_count: Mapped[int] = mapped_column(
+        BigInteger, nullable=False, server_default="0"
+    )
+
+
+class ArticleBlobModel(Base):
+    __tablename__ = "article_blobs"
+    __table_args__ = (
+        Index(
+            "ix_article_blobs_orphans",
+            "touched_at",
+            postgresql_where=text("refcount = 0"),
+        ),
+    )
+    s3_key: Mapped[str] = mapped_column(unique=True, nullable=False)
+    size: Mapped[int] = mapped_column(BigInteger, nullable=True)
+    refcount: Mapped[int] = mapped_column(
+        BigInteger, nullable=False, server_default="0"
+    )
+    touched_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=settings.timezone), server_default=func.now()
+    )
+
+
+GLOBAL_COUNTER_ID = 0
+
+_counters_upsert = """
+    ON CONFLICT (category_id) DO UPDATE
+    SET articles_count = article_counters.articles_count + EXCLUDED.articles_count
+"""
+
+article_counters_ddl = [
+    DDL(
+        f"""
+        CREATE OR REPLACE FUNCTION articles_count_trigger() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                INSERT INTO article_counters (category_id, articles_count)
+                SELECT {GLOBAL_COUNTER_ID}, count(*) FROM new_rows {_counters_upsert};
+            ELSE
+                INSERT INTO article_counters (category_id, articles_count)
+                SELECT {GLOBAL_COUNTER_ID}, -count(*) FROM old_rows {_counters_upsert};
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    ),
+    DDL(
+        f"""
+        CREATE OR REPLACE FUNCTION categories_articles_count_trigger()
+        RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                INSERT INTO article_counters (category_id, articles_count)
+                SELECT category_id, count(*) FROM new_rows GROUP BY category_id
+                {_counters_upsert};
+            ELSIF TG_OP = 'DELETE' THEN
+                INSERT INTO article_counters (category_id, articles_count)
+                SELECT category_id, -count(*) FROM old_rows GROUP BY category_id
+                {_counters_upsert};
+            ELSE
+                INSERT INTO article_counters (category_id, articles_count)
+                SELECT category_id, sum(delta) FROM (
+                    SELECT category_id, 1 AS delta FROM new_rows
+                    UNION ALL
+                    SELECT category_id, -1 AS delta FROM old_rows
+                ) AS moved
+                GROUP BY category_id HAVING sum(delta) <> 0
+                {_counters_upsert};
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    ),
+]
+for table, function in (
+    ("articles", "articles_count_trigger"),
+    ("categories_articles", "categories_articles_count_trigger"),
+):
+    article_counters_ddl += [
+        DDL(
+            f"""
+            CREATE OR REPLACE TRIGGER {table}_count_insert AFTER INSERT ON {table}
+            REFERENCING NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION {function}()
+            """
+        ),
+        DDL(
+            f"""
+            CREATE OR REPLACE TRIGGER {table}_count_delete AFTER DELETE ON {table}
+            REFERENCING OLD TABLE AS old_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION {function}()
+            """
+        ),
+    ]
+article_counters_ddl.append(
+    DDL(
+        """
+        CREATE OR REPLACE TRIGGER categories_articles_count_update
+        AFTER UPDATE ON categories_articles
+        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION categories_articles_count_trigger()
+        """
+    )
+)
+
+article_blobs_ddl = [
+    DDL(
+        """
+        CREATE OR REPLACE FUNCTION article_blobs_refcount_trigger()
+        RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                INSERT INTO article_blobs (s3_key, refcount)
+                SELECT s3_key, count(*) FROM new_rows GROUP BY s3_key
+                ON CONFLICT (s3_key) DO UPDATE
+                SET refcount = article_blobs.refcount + EXCLUDED.refcount;
+            ELSE
+                UPDATE article_blobs
+                SET refcount = article_blobs.refcount - released.count,
+                    touched_at = now()
+                FROM (
+                    SELECT s3_key, count(*) AS count FROM old_rows GROUP BY s3_key
+                ) AS released
+                WHERE article_blobs.s3_key = released.s3_key;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    ),
+    DDL(
+        """
+        CREATE OR REPLACE TRIGGER articles_blobs_insert AFTER INSERT ON articles
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION article_blobs_refcount_trigger()
+        """
+    ),
+    DDL(
+        """
+        CREATE OR REPLACE TRIGGER articles_blobs_delete AFTER DELETE ON articles
+        REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION article_blobs_refcount_trigger()
+        """
+    ),
+]
+
+for ddl in article_counters_ddl + article_blobs_ddl:
+    event.listen(Base.metadata, "after_create", ddl)
@@ -0,0 +1,98 @@
+import asyncio
+import inspect
+import logging
+from collections import defaultdict
+from typing import Any, Awaitable, Callable
+
+from redis.asyncio import ConnectionPool, Redis
+
+from src.app.core.config import settings
+
+
+class RedisHelper:
+    def __init__(self, url: str, max_connections: int, socket_timeout: float):
+        self.url = url
+        self.socket_timeout = socket_timeout
+        self.pool = ConnectionPool.from_url(
+            url,
+            max_connections=max_connections,
+            socket_timeout=socket_timeout,
+            socket_connect_timeout=socket_timeout,
+            health_check_interval=30,
+        )
+        self.client = Redis(connection_pool=self.pool)
+        self.logger = logging.getLogger(__name__)
+        self._handlers: dict[str, list[Callable[[str], Any]]] = defaultdict(list)
+        self._on_subscribe: list[Callable[[], Awaitable[Any]]] = []
+        self._listener: asyncio.Task | None = None
+        self._ready = asyncio.Event()
+
+    def subscribe(
+        self,
+        channel: str,
+        handler: Callable[[str], Any],
+        on_subscribe: Callable[[], Awaitable[Any]] | None = None,
+    ):
+        self._handlers[channel].append(handler)
+        if on_subscribe is not None:
+            self._on_subscribe.append(on_subscribe)
+
+    async def publish(self, channel: str, message: str):
+        await self.client.publish(channel, message)
+
+    async def start(self, ready_timeout: float = 5.0):
+        if self._handlers and self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+            try:
+                await asyncio.wait_for(self._ready.wait(), ready_timeout)
+            except asyncio.TimeoutError:
+                self.logger.warning("Redis subscriptions are not ready yet")
+
+    async def close(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            self._listener = None
+        await self.client.aclose()
+        await self.pool.disconnect()
+
+    async def _listen(self):
+        while True:
+            try:
+                subscriber = Redis.from_url(
+                    self.url,
+                    socket_connect_timeout=self.socket_timeout,
+                    health_check_interval=30,
+                )
+                async with subscriber, subscriber.pubsub() as pubsub:
+                    await pubsub.subscribe(*self._handlers)
+                    for callback in self._on_subscribe:
+                        await callback()
+                    self._ready.set()
+                    async for message in pubsub.listen():
+                        if message["type"] == "message":
+                            await self._dispatch(message["channel"], message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.warning(f"Redis subscription lost, reconnecting: {e}")
+                await asyncio.sleep(1)
+
+    async def _dispatch(self, channel: bytes | str, data: bytes | str):
+        if isinstance(channel, bytes):
+            channel = channel.decode()
+        if isinstance(data, bytes):
+            data = data.decode()
+        for handler in self._handlers.get(channel, ()):
+            try:
+                result = handler(data)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                self.logger.error(f"Redis handler for {channel} failed: {e}")
+
+
+redis_helper = RedisHelper(
+    url=settings.redis.url,
+    max_connections=settings.redis.max_connections,
+    socket_timeout=settings.redis.socket_timeout,
+)
@@ -1,12 +1,65 @@
 import asyncio
+import logging
+import os
+import time
 import uvicorn
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
+from prometheus_client import multiprocess
 from contextlib import asynccontextmanager
 
+from src.app.auth.mail_worker import mail_worker
+from src.app.auth.password_pool import password_hasher
+from src.app.core.config import settings
+from src.app.core.metrics import PrometheusMiddleware
+from src.app.core.profiling import ProfilingMiddleware, profile_store
 from src.app.database.db_helper import db_helper
+from src.app.database.minio_helper import s3_helper
 from src.app.database.models import Base
+from src.app.database.redis_helper import redis_helper
+from src.app.repositories.article_repository import ArticleRepository
+from src.app.routers.routers_articles import article_service
 from src.app.routers.routers_articles import router as blog_router
 from src.app.routers.routers_auth import router as auth_router
+from src.app.routers.routers_metrics import router as metrics_router
+from src.app.routers.routers_profiles import router as profiles_router
+from src.app.routers.routers_stats import router as stats_router
+
+logger = logging.getLogger(__name__)
+
+
+async def reconcile_article_counts_periodically():
+    interval = settings.article_counters.reconcile_interval_seconds
+    while True:
+        await asyncio.sleep(interval - time.time() % interval)
+        try:
+            async with db_helper.session_factory() as session:
+                await ArticleRepository().reconcile_article_counts(session)
+        except Exception as e:
+            logger.error(f"Article counters reconciliation failed: {e}")
+
+
+async def collect_orphaned_blobs_periodically():
+    interval = settings.article_blobs.gc_interval_seconds
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            while await article_service.collect_orphaned_blobs(
+                db_helper.session_factory
+            ):
+                pass
+        except Exception as e:
+            logger.error(f"Orphaned article blobs collection failed: {e}")
+
+
+async def sweep_abandoned_uploads_periodically():
+    interval = settings.streaming_upload.sweep_interval_seconds
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await article_service.sweep_abandoned_uploads()
+        except Exception as e:
+            logger.error(f"Abandoned uploads sweep failed: {e}")
 
 
 @asynccontextmanager
@@ -17,21 +70,70 @@ async def lifespan(apps: FastAPI):
                 await conn.run_sync(Base.metadata.create_all)
             break
         except Exception as e:
-            print(f"Database not ready, retrying... {e}")
+            logger.warning(f"Database not ready, retrying... {e}")
             await asyncio.sleep(2)
     else:
         raise RuntimeError("Database not ready after 10 retries")
+    await s3_helper.start()
+    await redis_helper.start()
+    reconcile_task = asyncio.create_task(reconcile_article_counts_periodically())
+    blobs_gc_task = asyncio.create_task(collect_orphaned_blobs_periodically())
+    uploads_sweep_task = asyncio.create_task(sweep_abandoned_uploads_periodically())
+    replicas_task = None
+    if db_helper.replicas:
+        replicas_task = asyncio.create_task(
+            db_helper.monitor_replicas(settings.DB_REPLICA_CHECK_INTERVAL)
+        )
+    mail_task = None
+    if settings.mail.run_worker:
+        mail_task = asyncio.create_task(mail_worker.run())
     yield
+    reconcile_task.cancel()
+    blobs_gc_task.cancel()
+    uploads_sweep_task.cancel()
+    if mail_task is not None:
+        mail_task.cancel()
+    if replicas_task is not None:
+        replicas_task.cancel()
+    await s3_helper.close()
+    await redis_helper.close()
+    password_hasher.shutdown()
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(os.getpid())
 
     async with db_helper.engine.begin() as conn:
         await conn.run_sync(Base.metadata.drop_all)
         await conn.commit()
+    await db_helper.dispose()
 
 
-app = FastAPI(title="Marketplace.com", lifespan=lifespan)
+app = FastAPI(
+    title="Marketplace.com",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
 
 app.include_router(auth_router)
 app.include_router(blog_router)
+app.include_router(stats_router)
+
+if settings.profiling.enabled:
+    app.add_middleware(
+        ProfilingMiddleware,
+        store=profile_store,
+        token=settings.profiling.token,
+        header=settings.profiling.header,
+        sample_rate=settings.profiling.sample_rate,
+        interval_seconds=settings.profiling.interval_seconds,
+        max_calls=settings.profiling.max_calls,
+    )
+    app.include_router(profiles_router)
+
+if settings.metrics.enabled:
+    app.add_middleware(
+        PrometheusMiddleware, route_cache_size=settings.metrics.route_cache_size
+    )
+    app.include_router(metrics_router)
 
 if __name__ == "__main__":
     uvicorn.run("main:app", reload=True)
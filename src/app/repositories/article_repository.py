@@ -1,9 +1,53 @@
+import hashlib
+import math
+import time
+from datetime import timedelta
+
+from sqlalchemy import (
+    BigInteger,
+    Row,
+    Text,
+    cast,
+    delete,
+    literal,
+    tuple_,
+)
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.exc import NoResultFound
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.sql.expression import func
 
-from src.app.database.models import ArticleModel, CategoryArticleModel
+from src.app.core.config import settings
+from src.app.core.pagination import (
+    InvalidCursorError,
+    decode_cursor,
+    encode_cursor,
+)
+from src.app.database.models import (
+    GLOBAL_COUNTER_ID,
+    ArticleBlobModel,
+    ArticleCounterModel,
+    ArticleModel,
+    CategoryArticleModel,
+)
+
+ARTICLE_SUMMARY_COLUMNS = (
+    ArticleModel.id,
+    ArticleModel.title,
+    ArticleModel.short_description,
+    ArticleModel.author,
+    ArticleModel.created_at,
+)
+
+RECONCILE_LOCK_ID = int.from_bytes(
+    hashlib.sha256(b"reconcile_article_counts").digest()[:8], "big", signed=True
+)
+
+RANDOM_WINDOW_ROWS = 256
+RANDOM_WINDOW_EPSILON = 1e-12
+
+_approximate_counts: dict[int, tuple[float, int]] = {}
 
 
 class ArticleRepository:
@@ -14,61 +58,333 @@ class ArticleRepository:
         description: str,
         s3_key: str,
         author: str,
-    ):
-        search_vector = func.to_tsvector("russian", f"{title} {description}")
-        article = ArticleModel(
-            title=title,
-            short_description=description,
-            s3_key=s3_key,
-            search_vector=search_vector,
-            author=author,
+    ) -> Row:
+        result = await session.execute(
+            insert(ArticleModel)
+            .values(
+                title=title,
+                short_description=description,
+                link_body=s3_key,
+                s3_key=s3_key,
+                author=author,
+            )
+            .returning(*ARTICLE_SUMMARY_COLUMNS)
         )
-        session.add(article)
+        article = result.one()
         await session.commit()
-        await session.refresh(article)
         return article
 
-    async def search_articles(self, session: AsyncSession, query: str):
-        search_query = func.to_tsquery("russian", query)
+    async def add_articles(
+        self, session: AsyncSession, articles: list[dict]
+    ) -> list[int]:
         result = await session.execute(
-            select(ArticleModel)
-            .where(ArticleModel.search_vector.op("@@")(search_query))
-            .order_by(func.ts_rank(ArticleModel.search_vector, search_query).desc())
+            insert(ArticleModel).returning(
+                ArticleModel.id, sort_by_parameter_order=True
+            ),
+            [
+                {
+                    "title": article["title"],
+                    "short_description": article["description"],
+                    "link_body": article["s3_key"],
+                    "s3_key": article["s3_key"],
+                    "author": article["author"],
+                }
+                for article in articles
+            ],
+        )
+        ids = list(result.scalars())
+        await session.commit()
+        return ids
+
+    async def claim_blobs(
+        self, session: AsyncSession, blobs: dict[str, int]
+    ) -> set[str]:
+        if not blobs:
+            return set()
+        stmt = insert(ArticleBlobModel).values(
+            [{"s3_key": key, "size": blobs[key]} for key in sorted(blobs)]
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ArticleBlobModel.s3_key], set_={"touched_at": func.now()}
+        ).returning(ArticleBlobModel.s3_key, ArticleBlobModel.refcount)
+        result = await session.execute(stmt)
+        live = {key for key, refcount in result if refcount > 0}
+        await session.commit()
+        return live
+
+    async def lock_orphaned_blobs(
+        self, session: AsyncSession, grace_seconds: int, limit: int
+    ) -> list[str]:
+        result = await session.execute(
+            select(ArticleBlobModel.s3_key)
+            .where(
+                ArticleBlobModel.refcount == 0,
+                ArticleBlobModel.touched_at
+                < func.now() - timedelta(seconds=grace_seconds),
+            )
+            .order_by(ArticleBlobModel.touched_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        return list(result.scalars())
+
+    async def delete_blobs(self, session: AsyncSession, keys: list[str]):
+        await session.execute(
+            delete(ArticleBlobModel).where(
+                ArticleBlobModel.s3_key.in_(keys), ArticleBlobModel.refcount == 0
+            )
+        )
+
+    async def search_articles(
+        self,
+        session: AsyncSession,
+        query: str,
+        limit: int,
+        cursor: str | None = None,
+        total_cap: int = 1000,
+    ) -> tuple[list[Row], str | None, int, bool]:
+        search_query = func.websearch_to_tsquery("russian", query)
+        matches = ArticleModel.search_vector.op("@@")(search_query)
+        rank = func.ts_rank(ArticleModel.search_vector, search_query)
+
+        page_query = (
+            select(*ARTICLE_SUMMARY_COLUMNS, rank.label("rank"))
+            .where(matches)
+            .order_by(rank.desc(), ArticleModel.id.desc())
+            .limit(limit + 1)
+        )
+        if cursor:
+            position = decode_cursor(cursor)
+            try:
+                after = (float(position["r"]), int(position["i"]))
+            except (KeyError, TypeError, ValueError):
+                raise InvalidCursorError("invalid cursor position")
+            page_query = page_query.where(
+                tuple_(rank, ArticleModel.id) < tuple_(*after)
+            )
+        rows = (await session.execute(page_query)).all()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor({"r": rows[-1].rank, "i": rows[-1].id})
+
+        capped = select(ArticleModel.id).where(matches).limit(total_cap + 1).subquery()
+        total = await session.scalar(select(func.count()).select_from(capped))
+        is_estimate = total > total_cap
+        return rows, next_cursor, min(total, total_cap), is_estimate
+
+    async def normalize_search_query(self, session: AsyncSession, query: str) -> str:
+        return await session.scalar(
+            select(cast(func.websearch_to_tsquery("russian", query), Text))
         )
-        return result.scalars().all()
 
     async def get_article_metadata(self, session: AsyncSession, article_id: int):
         try:
             result = await session.execute(
-                select(ArticleModel).where(ArticleModel.id == article_id)
+                select(*ARTICLE_SUMMARY_COLUMNS, ArticleModel.s3_key).where(
+                    ArticleModel.id == article_id
+                )
             )
-            return result.scalar_one()
+            return result.one()
         except NoResultFound:
             return None
 
+    async def get_articles_metadata(
+        self, session: AsyncSession, article_ids: list[int]
+    ) -> list[Row]:
+        if not article_ids:
+            return []
+        result = await session.execute(
+            select(*ARTICLE_SUMMARY_COLUMNS).where(ArticleModel.id.in_(article_ids))
+        )
+        articles = {article.id: article for article in result}
+        return [articles[i] for i in article_ids if i in articles]
+
     async def get_article_count(self, session: AsyncSession, category_id: int) -> int:
-        query = select(func.count(ArticleModel.id))
-        if category_id:
-            query = query.join(CategoryArticleModel).where(
-                CategoryArticleModel.category_id == category_id
+        counter_id = category_id or GLOBAL_COUNTER_ID
+        counters = settings.article_counters
+        if counters.approximate:
+            cached = _approximate_counts.get(counter_id)
+            if cached and cached[0] > time.monotonic():
+                return cached[1]
+
+        res = await session.execute(
+            select(ArticleCounterModel.articles_count).where(
+                ArticleCounterModel.category_id == counter_id
             )
-        res = await session.execute(query)
-        return res.scalar()
+        )
+        count = res.scalar() or 0
+        if counters.approximate:
+            _approximate_counts[counter_id] = (
+                time.monotonic() + counters.cache_ttl_seconds,
+                count,
+            )
+        return count
 
-    async def get_id_articles(
-        self, session: AsyncSession, page: int, page_size: int, category_id: int
-    ):
-        offset = (page - 1) * page_size
+    async def reconcile_article_counts(self, session: AsyncSession) -> bool:
+        async with session.begin():
+            locked = await session.scalar(
+                select(func.pg_try_advisory_xact_lock(RECONCILE_LOCK_ID))
+            )
+            if not locked:
+                return False
+            totals = (
+                select(
+                    literal(GLOBAL_COUNTER_ID).label("category_id"),
+                    func.count(ArticleModel.id).label("articles_count"),
+                )
+                .union_all(
+                    select(
+                        CategoryArticleModel.category_id,
+                        func.count(CategoryArticleModel.article_id),
+                    ).group_by(CategoryArticleModel.category_id)
+                )
+                .subquery()
+            )
+            drift = func.coalesce(totals.c.articles_count, 0) - func.coalesce(
+                ArticleCounterModel.articles_count, 0
+            )
+            drifted = (
+                select(
+                    func.coalesce(
+                        totals.c.category_id, ArticleCounterModel.category_id
+                    ),
+                    drift,
+                )
+                .select_from(
+                    totals.join(
+                        ArticleCounterModel,
+                        ArticleCounterModel.category_id == totals.c.category_id,
+                        full=True,
+                    )
+                )
+                .where(drift != 0)
+            )
+            stmt = insert(ArticleCounterModel).from_select(
+                ["category_id", "articles_count"], drifted
+            )
+            await session.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=[ArticleCounterModel.category_id],
+                    set_={
+                        "articles_count": ArticleCounterModel.articles_count
+                        + stmt.excluded.articles_count
+                    },
+                )
+            )
+        _approximate_counts.clear()
+        return True
+
+    async def get_random_page(
+        self,
+        session: AsyncSession,
+        seed: str,
+        page_size: int,
+        category_id: int,
+        cursor: str | None = None,
+        total: int | None = None,
+    ) -> tuple[list[int], str | None]:
+        seed_value = seed_to_int(seed)
+        if cursor:
+            position = decode_cursor(cursor)
+            try:
+                windows = int(position["n"])
+                offset = int(position["j"])
+                after = (int(position["b"]), int(position["h"]), int(position["i"]))
+            except (KeyError, TypeError, ValueError):
+                raise InvalidCursorError("invalid cursor position")
+            if windows < 1 or not 0 <= offset < windows:
+                raise InvalidCursorError("invalid cursor position")
+        else:
+            if total is None:
+                total = await self.get_article_count(session, category_id)
+            windows = max(math.ceil(total / RANDOM_WINDOW_ROWS), 1)
+            offset, after = 0, None
+
+        first_window = int(seed_to_start(seed) * windows)
+        span = math.ceil(page_size / RANDOM_WINDOW_ROWS) + 1
+        rows = []
+        while len(rows) < page_size and offset < windows:
+            window = (first_window + offset) % windows
+            count = min(span, windows - window, windows - offset)
+            rows += await self._random_windows(
+                session,
+                page_size - len(rows),
+                category_id,
+                seed_value,
+                windows,
+                window,
+                count,
+                after,
+            )
+            if len(rows) < page_size:
+                offset += count
+                after = None
+
+        next_cursor = None
+        if len(rows) == page_size:
+            bucket, mixed, article_id = rows[-1]
+            next_cursor = encode_cursor(
+                {
+                    "n": windows,
+                    "j": (bucket - 1 - first_window) % windows,
+                    "b": bucket,
+                    "h": mixed,
+                    "i": article_id,
+                }
+            )
+        return [article_id for _, _, article_id in rows], next_cursor
+
+    async def _random_windows(
+        self,
+        session: AsyncSession,
+        limit: int,
+        category_id: int,
+        seed_value: int,
+        windows: int,
+        window: int,
+        count: int,
+        after: tuple[int, int, int] | None = None,
+    ) -> list[tuple[int, int, int]]:
+        if category_id:
+            random_key = CategoryArticleModel.random_key
+            article_id = CategoryArticleModel.article_id
+        else:
+            random_key = ArticleModel.random_key
+            article_id = ArticleModel.id
+        bucket = func.width_bucket(random_key, 0.0, 1.0, windows)
+        mixed = func.hashtextextended(
+            cast(article_id, Text), literal(seed_value, BigInteger)
+        )
         query = (
-            select(ArticleModel.id)
-            .order_by(func.random())
-            .offset(offset)
-            .limit(page_size)
+            select(bucket, mixed, article_id)
+            .where(
+                random_key >= window / windows - RANDOM_WINDOW_EPSILON,
+                random_key < (window + count) / windows + RANDOM_WINDOW_EPSILON,
+                bucket.between(window + 1, window + count),
+            )
+            .order_by(bucket, mixed, article_id)
+            .limit(limit)
         )
         if category_id:
-            query = query.join(CategoryArticleModel).where(
-                CategoryArticleModel.category_id == category_id
+            query = query.where(CategoryArticleModel.category_id == category_id)
+        if after is not None:
+            after_bucket, after_mixed, after_id = after
+            query = query.where(
+                tuple_(bucket, mixed, article_id)
+                > tuple_(after_bucket, literal(after_mixed, BigInteger), after_id)
             )
 
         result = await session.execute(query)
-        return [row[0] for row in result.fetchall()]
+        return [(row[0], row[1], row[2]) for row in result.fetchall()]
+
+
+def seed_to_start(seed: str) -> float:
+    digest = hashlib.blake2b(seed.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big") / 2**64
+
+
+def seed_to_int(seed: str) -> int:
+    digest = hashlib.blake2b(seed.encode(), digest_size=8, person=b"mix").digest()
+    return int.from_bytes(digest, "big", signed=True)
@@ -1,9 +1,11 @@
 from abc import ABC, abstractmethod
 
+from sqlalchemy import update
 from sqlalchemy.exc import NoResultFound
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
+from src.app.auth.principals import principal_cache
 from src.app.database.models import UserModel
 
 
@@ -24,6 +26,10 @@ class IUserRepository(ABC):
     async def update(self, username: str):
         pass
 
+    @abstractmethod
+    async def update_password(self, username: str, password: bytes):
+        pass
+
     @abstractmethod
     async def delete(self, user_id: int):
         pass
@@ -39,16 +45,15 @@ class UserRepository(IUserRepository):
 
     async def check_user(self, username: str) -> bool:
         result = await self.session.execute(
-            select(UserModel).where(UserModel.username == username)
+            select(UserModel.id).where(UserModel.username == username).limit(1)
         )
         return result.scalar() is not None
 
     async def get(self, username: str):
-        async with self.session.begin():
-            result = await self.session.execute(
-                select(UserModel).where(UserModel.username == username)
-            )
-            return result.scalar_one_or_none()
+        result = await self.session.execute(
+            select(UserModel).where(UserModel.username == username)
+        )
+        return result.scalar_one_or_none()
 
     async def add(self, user: UserModel):
         self.session.add(user)
@@ -61,15 +66,25 @@ class UserRepository(IUserRepository):
         user = result.scalar_one_or_none()
         if user is None:
             raise NoResultFound()
-        user.is_active = True
+        user.active = True
+        await self.session.commit()
+        await principal_cache.invalidate(username)
+
+    async def update_password(self, username: str, password: bytes):
+        await self.session.execute(
+            update(UserModel)
+            .where(UserModel.username == username)
+            .values(password=password)
+        )
         await self.session.commit()
+        await principal_cache.invalidate(username)
 
     async def delete(self, username: str):
-        async with self.session.begin():
-            user = await self.get(username)
-            if user:
-                await self.session.delete(user)
-                await self.session.commit()
+        user = await self.get(username)
+        if user:
+            await self.session.delete(user)
+            await self.session.commit()
+            await principal_cache.invalidate(username)
 
     async def commit(self):
         await self.session.commit()
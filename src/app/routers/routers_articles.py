@@ -1,70 +1,116 @@
-from fastapi import APIRouter, Depends, HTTPException
+import json
+import secrets
+from email.utils import format_datetime
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response
 from fastapi.params import Query
+from fastapi.responses import RedirectResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.background import BackgroundTask
 
 from src.app.auth.tokens import (
     get_current_active_auth_user,
     get_current_token_payload,
     http_bearer,
 )
+from src.app.core.config import settings
+from src.app.core.pagination import InvalidCursorError
 from src.app.database.db_helper import db_helper
-from src.app.repositories import s3_repository
+from src.app.database.minio_helper import InvalidRangeError, s3_helper
 from src.app.repositories import article_repository
-from src.app.schemas.schemas import UserSchema
-from src.app.services.article_service import ArticleService
+from src.app.schemas.schemas import (
+    ArticleContentUrl,
+    ArticleFeedPage,
+    ArticleSearchPage,
+    ArticleUploadResult,
+    CompleteUpload,
+    PresignedUpload,
+    PresignedUploadRequest,
+    PrincipalSchema,
+)
+from src.app.services.article_service import (
+    IMMUTABLE_CACHE_CONTROL,
+    ArticleNotFoundError,
+    ArticleNotModifiedError,
+    ArticleService,
+    UploadTooLargeError,
+    UploadVerificationError,
+    iter_file,
+    spool,
+)
+from src.app.services.content_cache import content_cache
+from src.app.services.search_cache import search_cache
 
-article_service = ArticleService(article_repository, s3_repository)
+article_service = ArticleService(
+    article_repository.ArticleRepository(),
+    s3_helper,
+    content_cache if settings.content_cache.enabled else None,
+    search_cache if settings.search_cache.enabled else None,
+)
 
 router = APIRouter(
     prefix="/articles", tags=["articles"], dependencies=[Depends(http_bearer)]
 )
 
 
-@router.get("/random/")
+@router.get("/random/", response_model=ArticleFeedPage)
 async def get_random_articles(
-    page: int = Query(1, ge=1),
     page_size: int = Query(10, ge=1, le=100),
-    session: AsyncSession = Depends(db_helper.session_dependency),
+    seed: str = Query(None, max_length=64),
+    cursor: str = Query(None),
+    session: AsyncSession = Depends(db_helper.read_session_dependency),
     article_repo: article_repository.ArticleRepository = Depends(),
     category_id: int = Query(None),
 ):
+    seed = seed or secrets.token_urlsafe(8)
     try:
         total_articles_result = await article_repo.get_article_count(
             session=session, category_id=category_id
         )
 
         if total_articles_result == 0:
-            return {"page": page, "page_size": page_size, "total": 0, "articles": []}
+            return {
+                "seed": seed,
+                "page_size": page_size,
+                "total": 0,
+                "articles": [],
+                "next_cursor": None,
+            }
         else:
-            article_ids = await article_repo.get_id_articles(
-                session=session, page=page, page_size=page_size, category_id=category_id
+            article_ids, next_cursor = await article_repo.get_random_page(
+                session=session,
+                seed=seed,
+                page_size=page_size,
+                category_id=category_id,
+                cursor=cursor,
+                total=total_articles_result,
             )
-
-            articles = []
-            for article_id in article_ids:
-                metadata = await article_repo.get_article_metadata(session, article_id)
-                if metadata:
-                    articles.append(metadata)
+            articles = await article_repo.get_articles_metadata(session, article_ids)
 
             return {
-                "page": page,
+                "seed": seed,
                 "page_size": page_size,
                 "total": total_articles_result,
                 "articles": articles,
+                "next_cursor": next_cursor,
             }
 
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {e}")
 
 
-@router.post("/upload/")
+@router.post("/upload/", response_model=ArticleUploadResult)
 async def upload_article(
     title: str,
     description: str,
     content: str,
+    response: Response,
     session: AsyncSession = Depends(db_helper.session_dependency),
     payload: dict = Depends(get_current_token_payload),
-    user: UserSchema = Depends(get_current_active_auth_user),
+    user: PrincipalSchema = Depends(get_current_active_auth_user),
 ):
     try:
         if not user:
@@ -81,6 +127,7 @@ async def upload_article(
             content=content,
             author=author,
         )
+        db_helper.mark_write(response)
         return {
             "message": "Article uploaded successfully",
             "article": article,
@@ -93,17 +140,184 @@ async def upload_article(
         raise HTTPException(status_code=500, detail=f"Internal server error: {e}")
 
 
-@router.get("/search/")
+@router.post("/upload-stream/", response_model=ArticleUploadResult)
+async def upload_article_stream(
+    title: str,
+    description: str,
+    request: Request,
+    response: Response,
+    session: AsyncSession = Depends(db_helper.session_dependency),
+    user: PrincipalSchema = Depends(get_current_active_auth_user),
+    content_length: int | None = Header(None),
+):
+    max_bytes = settings.streaming_upload.max_bytes
+    if content_length is not None and content_length > max_bytes:
+        raise HTTPException(
+            status_code=413, detail=f"Article exceeds {max_bytes} bytes"
+        )
+    try:
+        article = await article_service.upload_article_stream(
+            session=session,
+            title=title,
+            description=description,
+            chunks=request.stream(),
+            author=user.username,
+        )
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Article body is not UTF-8")
+    db_helper.mark_write(response)
+    return {
+        "message": "Article uploaded successfully",
+        "article": article,
+        "author": user.username,
+    }
+
+
+@router.post("/upload-url/", response_model=PresignedUpload)
+async def create_presigned_upload(
+    upload: PresignedUploadRequest,
+    session: AsyncSession = Depends(db_helper.session_dependency),
+    user: PrincipalSchema = Depends(get_current_active_auth_user),
+):
+    max_bytes = settings.content_delivery.upload_max_bytes
+    if upload.size > max_bytes:
+        raise HTTPException(
+            status_code=413, detail=f"Article exceeds {max_bytes} bytes"
+        )
+    return await article_service.create_upload(
+        session=session,
+        title=upload.title,
+        description=upload.description,
+        author=user.username,
+        sha256=upload.sha256,
+        size=upload.size,
+    )
+
+
+@router.post("/upload-complete/", response_model=ArticleUploadResult)
+async def complete_presigned_upload(
+    upload: CompleteUpload,
+    response: Response,
+    session: AsyncSession = Depends(db_helper.session_dependency),
+    user: PrincipalSchema = Depends(get_current_active_auth_user),
+):
+    try:
+        article = await article_service.complete_upload(
+            session=session, upload_token=upload.upload_token, author=user.username
+        )
+    except UploadVerificationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    db_helper.mark_write(response)
+    return {
+        "message": "Article uploaded successfully",
+        "article": article,
+        "author": user.username,
+    }
+
+
+@router.post("/bulk/")
+async def bulk_upload_articles(
+    request: Request,
+    user: PrincipalSchema = Depends(get_current_active_auth_user),
+):
+    body = await spool(request.stream())
+    results = article_service.ingest_articles(
+        session_factory=db_helper.session_factory,
+        lines=iter_file(body),
+        author=user.username,
+    )
+    response = StreamingResponse(
+        (json.dumps(result) + "\n" async for result in results),
+        media_type="application/x-ndjson",
+        background=BackgroundTask(body.close),
+    )
+    db_helper.mark_write(response)
+    return response
+
+
+@router.get("/search/", response_model=ArticleSearchPage)
 async def search_articles(
-    query: str, session: AsyncSession = Depends(db_helper.session_dependency)
+    query: str,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: str = Query(None),
+    session: AsyncSession = Depends(db_helper.read_session_dependency),
 ):
-    return await article_service.search_articles(session=session, query=query)
+    try:
+        return await article_service.search_articles(
+            session=session, query=query, limit=limit, cursor=cursor
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.get("/{article_id}/content")
 async def get_article_content(
-    article_id: int, session: AsyncSession = Depends(db_helper.session_dependency)
+    article_id: int,
+    byte_range: str = Header(None, alias="Range"),
+    if_range: str = Header(None, alias="If-Range"),
+    accept_encoding: str = Header(None, alias="Accept-Encoding"),
+    if_none_match: str = Header(None, alias="If-None-Match"),
+    session: AsyncSession = Depends(db_helper.read_session_dependency),
 ):
-    return await article_service.get_article_content(
-        session=session, article_id=article_id
+    delivery = settings.content_delivery
+    if delivery.mode in ("redirect", "url"):
+        try:
+            url = await article_service.article_content_url(
+                session=session, article_id=article_id, accept_encoding=accept_encoding
+            )
+        except ArticleNotFoundError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        if url is not None and delivery.mode == "redirect":
+            return RedirectResponse(
+                url, status_code=307, headers={"Vary": "Accept-Encoding"}
+            )
+        if url is not None:
+            return ArticleContentUrl(url=url, expires_in=delivery.presign_ttl_seconds)
+
+    try:
+        article = await article_service.open_article_content(
+            session=session,
+            article_id=article_id,
+            byte_range=byte_range,
+            if_range=if_range,
+            accept_encoding=accept_encoding,
+            if_none_match=if_none_match,
+        )
+    except ArticleNotModifiedError as e:
+        return Response(
+            status_code=304,
+            headers={
+                "ETag": e.etag,
+                "Cache-Control": IMMUTABLE_CACHE_CONTROL,
+                "Vary": "Accept-Encoding",
+            },
+        )
+    except ArticleNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except InvalidRangeError as e:
+        headers = None
+        if e.total is not None:
+            headers = {"Content-Range": f"bytes */{e.total}"}
+        raise HTTPException(status_code=416, detail=str(e), headers=headers)
+
+    headers = {"Accept-Ranges": "bytes", "Vary": "Accept-Encoding"}
+    if article.content_length is not None:
+        headers["Content-Length"] = str(article.content_length)
+    if article.content_encoding:
+        headers["Content-Encoding"] = article.content_encoding
+    if article.etag:
+        headers["ETag"] = article.etag
+    if article.last_modified:
+        headers["Last-Modified"] = format_datetime(article.last_modified, usegmt=True)
+    if article.content_range:
+        headers["Content-Range"] = article.content_range
+    if article.immutable:
+        headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+    return StreamingResponse(
+        article.body,
+        status_code=206 if article.partial else 200,
+        media_type=article.content_type,
+        headers=headers,
     )
@@ -1,28 +1,30 @@
-from datetime import datetime
+import time
 
-import redis
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from pydantic import EmailStr
-from sqlalchemy.exc import NoResultFound
+from sqlalchemy.exc import IntegrityError, NoResultFound
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.app.auth import utils as auth_utils
-from src.app.auth.send_mail import send_email
+from src.app.auth.password_pool import password_hasher
+from src.app.auth.revocation import revoked_tokens
+from src.app.auth.send_mail import mail_queue
 from src.app.auth.tokens import (
+    ACCESS_TOKEN_TYPE,
+    SESSION_ID,
     create_access_token,
     create_refresh_token,
     get_current_auth_user_for_refresh,
     get_current_token_payload,
     http_bearer,
-    oauth2_scheme,
+    new_session_id,
     validate_auth_user,
+    validate_token_type,
 )
+from src.app.core.config import settings
 from src.app.database.db_helper import db_helper
 from src.app.database.models import UserModel
 from src.app.repositories.users_repository import UserRepository
-from src.app.schemas.schemas import TokenInfo, UserSchema
-
-redis_client = redis.Redis(host="redis", port=6379, db=0, decode_responses=True)
+from src.app.schemas.schemas import PrincipalSchema, TokenInfo, UserSchema
 
 router = APIRouter(prefix="/users", tags=["users"], dependencies=[Depends(http_bearer)])
 
@@ -37,11 +39,18 @@ async def auth_user_register(
     user_repo = UserRepository(session)
     if not await user_repo.check_user(username):
         user = UserSchema(
-            username=username, password=auth_utils.hash_password(password), email=email
+            username=username,
+            password=await password_hasher.hash(password),
+            email=email,
         )
-        await user_repo.add(UserModel(**user.model_dump()))
+        try:
+            await user_repo.add(UserModel(**user.model_dump()))
+        except IntegrityError:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT, detail="User already exists"
+            )
         token = create_access_token(user)
-        send_email(token, address=email)
+        await mail_queue.enqueue_confirmation(token, address=email)
         return user
     else:
         raise HTTPException(
@@ -51,8 +60,9 @@ async def auth_user_register(
 
 @router.post("/login/", response_model=TokenInfo)
 def auth_user_issue_jwt(user: UserSchema = Depends(validate_auth_user)):
-    access_token = create_access_token(user)
-    refresh_token = create_refresh_token(user)
+    session_id = new_session_id()
+    access_token = create_access_token(user, session_id)
+    refresh_token = create_refresh_token(user, session_id)
     return TokenInfo(
         access_token=access_token,
         refresh_token=refresh_token,
@@ -60,19 +70,25 @@ def auth_user_issue_jwt(user: UserSchema = Depends(validate_auth_user)):
 
 
 @router.post("/refresh/", response_model=TokenInfo, response_model_exclude_none=True)
-def auth_refresh_jwt(user: UserSchema = Depends(get_current_auth_user_for_refresh)):
-    access_token = create_access_token(user)
+def auth_refresh_jwt(
+    user: PrincipalSchema = Depends(get_current_auth_user_for_refresh),
+    payload: dict = Depends(get_current_token_payload),
+):
+    access_token = create_access_token(user, payload.get(SESSION_ID))
     return TokenInfo(access_token=access_token)
 
 
 @router.post("/confirm/{token}")
 async def confirmation_email_user(
+    response: Response,
     session: AsyncSession = Depends(db_helper.session_dependency),
     payload: dict = Depends(get_current_token_payload),
 ):
+    validate_token_type(payload, ACCESS_TOKEN_TYPE)
     user_repo = UserRepository(session)
     try:
         await user_repo.update(username=payload["username"])
+        db_helper.mark_write(response)
         return status.HTTP_200_OK
     except NoResultFound:
         raise HTTPException(
@@ -82,8 +98,15 @@ async def confirmation_email_user(
 
 
 @router.post("/logout")
-def logout(token: str = Depends(oauth2_scheme)):
-    payload = auth_utils.decode_jwt(token)
-    exp_time = payload["exp"] - int(datetime.utcnow().timestamp())
-    redis_client.setex(token, exp_time, "revoked")
+async def logout(payload: dict = Depends(get_current_token_payload)):
+    jti = payload.get("jti")
+    if jti is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="token cannot be revoked"
+        )
+    await revoked_tokens.revoke(jti, payload["exp"])
+    session_id = payload.get(SESSION_ID)
+    if session_id:
+        expires_at = time.time() + settings.auth_jwt.refresh_token_expire_days * 86400
+        await revoked_tokens.revoke(session_id, expires_at)
     return {"message": "Successfully logged out"}
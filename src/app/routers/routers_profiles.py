@@ -0,0 +1,45 @@
+import hmac
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import FileResponse
+from starlette import status
+
+from src.app.core.config import settings
+from src.app.core.profiling import profile_store
+
+
+def require_profile_token(request: Request):
+    token = settings.profiling.token
+    provided = request.headers.get(settings.profiling.header)
+    if not token or provided is None or not hmac.compare_digest(provided, token):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="invalid profiling token"
+        )
+
+
+router = APIRouter(
+    prefix="/profiles",
+    tags=["profiles"],
+    dependencies=[Depends(require_profile_token)],
+)
+
+
+@router.get("/")
+def list_profiles():
+    return profile_store.list()
+
+
+@router.get("/{report_id}")
+def download_profile(report_id: str):
+    path = profile_store.report_path(report_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type=profile_store.media_type, filename=path.name)
+
+
+@router.get("/{report_id}/calls")
+def get_profile_calls(report_id: str):
+    meta = profile_store.meta(report_id)
+    if meta is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return meta
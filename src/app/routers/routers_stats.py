@@ -0,0 +1,21 @@
+from fastapi import APIRouter, Depends
+
+from src.app.auth.tokens import get_current_active_auth_user, http_bearer
+from src.app.database.db_helper import db_helper
+from src.app.services.content_cache import content_cache
+
+router = APIRouter(
+    prefix="/stats",
+    tags=["stats"],
+    dependencies=[Depends(http_bearer), Depends(get_current_active_auth_user)],
+)
+
+
+@router.get("/cache/")
+def get_cache_stats():
+    return {"content": content_cache.stats()}
+
+
+@router.get("/db-pool/")
+def get_db_pool_stats():
+    return db_helper.pool_stats()
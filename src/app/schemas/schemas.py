@@ -1,7 +1,8 @@
+from datetime import datetime
 from typing import Annotated
 
 from annotated_types import MaxLen, MinLen
-from pydantic import BaseModel, ConfigDict, EmailStr
+from pydantic import BaseModel, ConfigDict, EmailStr, Field
 
 
 class CreateUser(BaseModel):
@@ -18,6 +19,14 @@ class UserSchema(BaseModel):
     active: bool = False
 
 
+class PrincipalSchema(BaseModel):
+    model_config = ConfigDict(strict=True)
+
+    username: str
+    email: EmailStr | None = None
+    active: bool = False
+
+
 class TokenInfo(BaseModel):
     access_token: str
     refresh_token: str | None = None
@@ -40,3 +49,63 @@ class Article(BaseModel):
     s3_key: str
     created_data: str | None = None
     author: str
+
+
+class ArticleSummary(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    title: str
+    short_description: str
+    author: str
+    created_at: datetime
+
+
+class ArticleFeedPage(BaseModel):
+    seed: str
+    page_size: int
+    total: int
+    articles: list[ArticleSummary]
+    next_cursor: str | None = None
+
+
+class ArticleSearchPage(BaseModel):
+    articles: list[ArticleSummary]
+    next_cursor: str | None = None
+    total: int
+    total_is_estimate: bool
+
+
+class ArticleUploadResult(BaseModel):
+    message: str
+    article: ArticleSummary
+    author: str
+
+
+class ArticleContentUrl(BaseModel):
+    url: str
+    expires_in: int
+
+
+class PresignedUploadRequest(BaseModel):
+    title: str
+    description: str
+    sha256: Annotated[str, Field(pattern=r"^[0-9a-f]{64}$")]
+    size: Annotated[int, Field(gt=0)]
+
+
+class PresignedUpload(BaseModel):
+    upload_token: str
+    upload_url: str | None = None
+    headers: dict[str, str] = {}
+    expires_in: int
+
+
+class CompleteUpload(BaseModel):
+    upload_token: str
+
+
+class BulkArticle(BaseModel):
+    title: str
+    description: str
+    content: str
@@ -1,13 +1,74 @@
-from sqlalchemy.ext.asyncio import AsyncSession
+import asyncio
+import base64
+import codecs
+import hashlib
+import tempfile
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator
 
-from src.app.database.minio_helper import S3Repository
+from jwt import InvalidTokenError
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.app.auth import utils as auth_utils
+from src.app.auth.revocation import revoked_tokens
+from src.app.core.compression import accepts_encoding, compressor
+from src.app.core.config import settings
+from src.app.database.minio_helper import (
+    UNCOMPRESSED_LENGTH,
+    S3Repository,
+    StoredObject,
+    content_digest,
+    content_key,
+    digest_key,
+    matching_etag,
+    representation_etag,
+)
 from src.app.repositories.article_repository import ArticleRepository
+from src.app.schemas.schemas import BulkArticle
+from src.app.services.content_cache import CachedContent, ContentCache
+from src.app.services.search_cache import SearchCache
+
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+UPLOAD_TOKEN_TYPE = "article_upload"
+
+
+class ArticleNotFoundError(RuntimeError):
+    pass
+
+
+class UploadVerificationError(ValueError):
+    pass
+
+
+class ArticleNotModifiedError(Exception):
+    def __init__(self, etag: str):
+        super().__init__(etag)
+        self.etag = etag
+
+
+class LineTooLongError(ValueError):
+    pass
+
+
+class UploadTooLargeError(ValueError):
+    pass
 
 
 class ArticleService:
-    def __init__(self, db_repo: ArticleRepository, s3_repo: S3Repository):
+    def __init__(
+        self,
+        db_repo: ArticleRepository,
+        s3_repo: S3Repository,
+        content_cache: ContentCache | None = None,
+        search_cache: SearchCache | None = None,
+    ):
         self.db_repo = db_repo
         self.s3_repo = s3_repo
+        self.content_cache = content_cache
+        self.search_cache = search_cache
 
     async def upload_article(
         self,
@@ -17,23 +78,508 @@ class ArticleService:
         content: str,
         author: str,
     ):
-        article_id = hash(title)
-        s3_key = self.s3_repo.upload_article(article_id, content)
-        return await self.db_repo.add_article(
+        return await self._store_article(
+            session, title, description, content.encode("utf-8"), author
+        )
+
+    async def upload_article_stream(
+        self,
+        session: AsyncSession,
+        title: str,
+        description: str,
+        chunks: AsyncIterator[bytes],
+        author: str,
+        part_size: int = settings.streaming_upload.part_size,
+        concurrency: int = settings.streaming_upload.concurrency,
+        max_bytes: int = settings.streaming_upload.max_bytes,
+        temp_prefix: str = settings.streaming_upload.temp_prefix,
+    ):
+        chunks = chunks.__aiter__()
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        head = bytearray()
+        async for chunk in chunks:
+            decoder.decode(chunk)
+            head += chunk
+            if len(head) >= part_size:
+                break
+        else:
+            decoder.decode(b"", final=True)
+            if len(head) > max_bytes:
+                raise UploadTooLargeError(f"article exceeds {max_bytes} bytes")
+            return await self._store_article(
+                session, title, description, bytes(head), author
+            )
+
+        digest = hashlib.sha256(head)
+        size = len(head)
+        codec = self.s3_repo.compression
+        encoder = compressor(codec, self.s3_repo.compression_level) if codec else None
+
+        async def encoded() -> AsyncIterator[bytes]:
+            nonlocal size
+            first = bytes(head)
+            head.clear()
+            yield encoder.compress(first) if encoder else first
+            del first
+            async for chunk in chunks:
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLargeError(f"article exceeds {max_bytes} bytes")
+                decoder.decode(chunk)
+                digest.update(chunk)
+                yield encoder.compress(chunk) if encoder else chunk
+            decoder.decode(b"", final=True)
+            if encoder:
+                yield encoder.flush()
+
+        temp_key = f"{temp_prefix}{uuid.uuid4().hex}"
+        await self.s3_repo.upload_article_multipart(
+            temp_key,
+            encoded(),
+            part_size=part_size,
+            concurrency=concurrency,
+            content_encoding=codec,
+        )
+        try:
+            s3_key = digest_key(digest.hexdigest())
+            live = await self.db_repo.claim_blobs(session, {s3_key: size})
+            if s3_key not in live:
+                await self.s3_repo.copy_article(
+                    temp_key, s3_key, uncompressed_length=size, content_encoding=codec
+                )
+        finally:
+            await self.s3_repo.delete_article(temp_key)
+        return await self._add_article(session, title, description, s3_key, author)
+
+    async def _store_article(
+        self,
+        session: AsyncSession,
+        title: str,
+        description: str,
+        body: bytes,
+        author: str,
+    ):
+        s3_key = content_key(body)
+        live = await self.db_repo.claim_blobs(session, {s3_key: len(body)})
+        if s3_key not in live:
+            await self.s3_repo.upload_article(s3_key, body)
+        return await self._add_article(session, title, description, s3_key, author)
+
+    async def _add_article(
+        self,
+        session: AsyncSession,
+        title: str,
+        description: str,
+        s3_key: str,
+        author: str,
+    ):
+        article = await self.db_repo.add_article(
             session=session,
             title=title,
             description=description,
             s3_key=s3_key,
             author=author,
         )
+        if self.search_cache is not None:
+            await self.search_cache.bump_generation()
+        return article
+
+    async def create_upload(
+        self,
+        session: AsyncSession,
+        title: str,
+        description: str,
+        author: str,
+        sha256: str,
+        size: int,
+        ttl_seconds: int = settings.content_delivery.upload_ttl_seconds,
+    ) -> dict:
+        s3_key = digest_key(sha256)
+        live = await self.db_repo.claim_blobs(session, {s3_key: size})
+        upload = {
+            "upload_token": auth_utils.encode_jwt(
+                payload={
+                    "type": UPLOAD_TOKEN_TYPE,
+                    "sub": author,
+                    "title": title,
+                    "description": description,
+                    "s3_key": s3_key,
+                    "size": size,
+                },
+                expire_timedelta=timedelta(seconds=ttl_seconds),
+            ),
+            "expires_in": ttl_seconds,
+        }
+        if s3_key not in live:
+            upload["upload_url"], upload["headers"] = await self.s3_repo.presign_put(
+                s3_key, size=size, sha256=sha256, ttl_seconds=ttl_seconds
+            )
+        return upload
 
-    async def search_articles(self, session: AsyncSession, query: str):
-        return await self.db_repo.search_articles(session, query)
+    async def complete_upload(
+        self, session: AsyncSession, upload_token: str, author: str
+    ):
+        try:
+            payload = auth_utils.decode_jwt(token=upload_token)
+        except InvalidTokenError as e:
+            raise UploadVerificationError(f"invalid upload token: {e}")
+        if payload.get("type") != UPLOAD_TOKEN_TYPE or payload.get("sub") != author:
+            raise UploadVerificationError("upload token was not issued to this user")
+
+        s3_key = payload["s3_key"]
+        await self._verify_upload(s3_key, payload["size"])
+        if not await revoked_tokens.consume(payload["jti"], payload["exp"]):
+            raise UploadVerificationError("upload token was already used")
+        return await self._add_article(
+            session, payload["title"], payload["description"], s3_key, author
+        )
 
-    async def get_article_content(self, session: AsyncSession, article_id: int):
+    async def _verify_upload(self, s3_key: str, size: int):
+        head = await self.s3_repo.head_article(s3_key)
+        if head is None:
+            raise UploadVerificationError("article content was not uploaded")
+        stored_size = head["ContentLength"]
+        if head.get("ContentEncoding"):
+            stored_size = int(
+                head.get("Metadata", {}).get(UNCOMPRESSED_LENGTH, stored_size)
+            )
+        if stored_size != size:
+            raise UploadVerificationError(
+                f"uploaded {stored_size} bytes, declared {size}"
+            )
+        digest = content_digest(s3_key)
+        checksum = base64.b64encode(bytes.fromhex(digest)).decode()
+        if head.get("ChecksumSHA256") == checksum:
+            return
+        if await self.s3_repo.article_sha256(s3_key) != digest:
+            raise UploadVerificationError("uploaded content does not match sha256")
+
+    async def ingest_articles(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        lines: AsyncIterator[bytes],
+        author: str,
+        batch_size: int = settings.bulk_ingest.batch_size,
+        storage_concurrency: int = settings.bulk_ingest.storage_concurrency,
+    ) -> AsyncIterator[dict]:
+        semaphore = asyncio.Semaphore(storage_concurrency)
+        batch: list[tuple[int, bytes]] = []
+        index = 0
+        try:
+            async for line in iter_lines(lines):
+                if not line.strip():
+                    continue
+                batch.append((index, line))
+                index += 1
+                if len(batch) >= batch_size:
+                    for result in await self._ingest_batch(
+                        session_factory, batch, author, semaphore
+                    ):
+                        yield result
+                    batch = []
+        except LineTooLongError as e:
+            batch.append((index, None))
+            stream_error = str(e)
+        else:
+            stream_error = None
+        if batch:
+            for result in await self._ingest_batch(
+                session_factory, batch, author, semaphore, stream_error
+            ):
+                yield result
+
+    async def _ingest_batch(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        batch: list[tuple[int, bytes | None]],
+        author: str,
+        semaphore: asyncio.Semaphore,
+        stream_error: str | None = None,
+    ) -> list[dict]:
+        results: dict[int, dict] = {}
+        parsed: list[tuple[int, BulkArticle]] = []
+        for index, line in batch:
+            if line is None:
+                results[index] = {"index": index, "error": stream_error}
+                continue
+            try:
+                parsed.append((index, BulkArticle.model_validate_json(line)))
+            except ValidationError as e:
+                results[index] = {"index": index, "error": str(e)}
+
+        bodies: dict[str, bytes] = {}
+        keys = []
+        for _, article in parsed:
+            body = article.content.encode("utf-8")
+            key = content_key(body)
+            bodies.setdefault(key, body)
+            keys.append(key)
+
+        failed: dict[str, BaseException] = {}
+        if bodies:
+            try:
+                async with session_factory() as session:
+                    live = await self.db_repo.claim_blobs(
+                        session, {key: len(body) for key, body in bodies.items()}
+                    )
+            except Exception as e:
+                live, failed = set(), dict.fromkeys(bodies, e)
+
+            async def store(key: str):
+                async with semaphore:
+                    await self.s3_repo.upload_article(key, bodies[key])
+
+            pending = [key for key in bodies if key not in live and key not in failed]
+            outcomes = await asyncio.gather(
+                *(store(key) for key in pending), return_exceptions=True
+            )
+            for key, outcome in zip(pending, outcomes):
+                if isinstance(outcome, BaseException):
+                    failed[key] = outcome
+
+        rows, stored = [], []
+        for (index, article), key in zip(parsed, keys):
+            if key in failed:
+                results[index] = {"index": index, "error": str(failed[key])}
+                continue
+            stored.append((index, key))
+            rows.append(
+                {
+                    "title": article.title,
+                    "description": article.description,
+                    "s3_key": key,
+                    "author": author,
+                }
+            )
+
+        if rows:
+            try:
+                async with session_factory() as session:
+                    ids = await self.db_repo.add_articles(session, rows)
+            except Exception as e:
+                ids = [e] * len(rows)
+            for (index, key), article_id in zip(stored, ids):
+                if isinstance(article_id, Exception):
+                    results[index] = {"index": index, "error": str(article_id)}
+                else:
+                    results[index] = {"index": index, "id": article_id, "s3_key": key}
+            if self.search_cache is not None:
+                await self.search_cache.bump_generation()
+
+        return [results[index] for index, _ in batch]
+
+    async def search_articles(
+        self,
+        session: AsyncSession,
+        query: str,
+        limit: int,
+        cursor: str | None = None,
+    ):
+        generation = None
+        if self.search_cache is not None:
+            normalized = await self.db_repo.normalize_search_query(session, query)
+            cached, generation = await self.search_cache.get(normalized, limit, cursor)
+            if cached is not None:
+                articles = await self.db_repo.get_articles_metadata(
+                    session, cached.pop("ids")
+                )
+                return {"articles": articles, **cached}
+
+        articles, next_cursor, total, is_estimate = await self.db_repo.search_articles(
+            session, query, limit=limit, cursor=cursor
+        )
+        page = {
+            "next_cursor": next_cursor,
+            "total": total,
+            "total_is_estimate": is_estimate,
+        }
+        if generation is not None:
+            await self.search_cache.set(
+                normalized,
+                limit,
+                cursor,
+                generation,
+                {"ids": [article.id for article in articles], **page},
+            )
+        return {"articles": articles, **page}
+
+    async def open_article_content(
+        self,
+        session: AsyncSession,
+        article_id: int,
+        byte_range: str | None = None,
+        if_range: str | None = None,
+        accept_encoding: str | None = None,
+        if_none_match: str | None = None,
+    ) -> StoredObject:
         metadata = await self.db_repo.get_article_metadata(
             session=session, article_id=article_id
         )
         if not metadata:
-            raise RuntimeError("Article not found")
-        return self.s3_repo.get_article(metadata.s3_key)
+            raise ArticleNotFoundError("Article not found")
+        digest = content_digest(metadata.s3_key)
+        if digest is None:
+            return await self._open_content(
+                metadata.s3_key, byte_range, if_range, accept_encoding
+            )
+
+        if if_none_match:
+            etag = matching_etag(if_none_match, digest, accept_encoding)
+            if etag:
+                raise ArticleNotModifiedError(etag)
+        if if_range is not None and not if_range.startswith(f'"{digest}'):
+            byte_range = None
+        stored = await self._open_content(
+            metadata.s3_key, byte_range, None, accept_encoding
+        )
+        etag = representation_etag(digest, stored.content_encoding)
+        if stored.partial and if_range is not None and if_range != etag:
+            await stored.body.aclose()
+            stored = await self._open_content(
+                metadata.s3_key, None, None, accept_encoding
+            )
+        stored.etag = etag
+        stored.immutable = True
+        return stored
+
+    async def article_content_url(
+        self,
+        session: AsyncSession,
+        article_id: int,
+        accept_encoding: str | None = None,
+        ttl_seconds: int = settings.content_delivery.presign_ttl_seconds,
+    ) -> str | None:
+        metadata = await self.db_repo.get_article_metadata(
+            session=session, article_id=article_id
+        )
+        if not metadata:
+            raise ArticleNotFoundError("Article not found")
+        codec = await self.s3_repo.article_encoding(metadata.s3_key)
+        if codec and not accepts_encoding(accept_encoding, codec):
+            return None
+        cache_control = None
+        if content_digest(metadata.s3_key) is not None:
+            cache_control = IMMUTABLE_CACHE_CONTROL
+        return await self.s3_repo.presign_get(
+            metadata.s3_key, ttl_seconds=ttl_seconds, cache_control=cache_control
+        )
+
+    async def collect_orphaned_blobs(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        grace_seconds: int = settings.article_blobs.gc_grace_seconds,
+        batch_size: int = settings.article_blobs.gc_batch_size,
+    ) -> int:
+        async with session_factory() as session:
+            async with session.begin():
+                keys = await self.db_repo.lock_orphaned_blobs(
+                    session, grace_seconds=grace_seconds, limit=batch_size
+                )
+                if keys:
+                    await self.s3_repo.delete_articles(keys)
+                    await self.db_repo.delete_blobs(session, keys)
+        return len(keys)
+
+    async def sweep_abandoned_uploads(
+        self,
+        abandoned_after_seconds: int = (
+            settings.streaming_upload.abandoned_after_seconds
+        ),
+        temp_prefix: str = settings.streaming_upload.temp_prefix,
+    ) -> int:
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=abandoned_after_seconds)
+        aborted = await self.s3_repo.abort_stale_multipart_uploads(
+            temp_prefix, initiated_before=cutoff
+        )
+        keys = await self.s3_repo.list_stale_articles(
+            temp_prefix, modified_before=cutoff
+        )
+        if keys:
+            await self.s3_repo.delete_articles(keys)
+        return aborted + len(keys)
+
+    async def _open_content(
+        self,
+        s3_key: str,
+        byte_range: str | None,
+        if_range: str | None,
+        accept_encoding: str | None,
+    ) -> StoredObject:
+        if self.content_cache is not None:
+            cached = await self.content_cache.get_or_fill(
+                s3_key, lambda: self._read_for_cache(s3_key)
+            )
+            if cached is not None:
+                return cached.open(
+                    byte_range=byte_range,
+                    if_range=if_range,
+                    accept_encoding=accept_encoding,
+                )
+        stored = await self.s3_repo.open_article(
+            s3_key,
+            byte_range=byte_range,
+            if_range=if_range,
+            accept_encoding=accept_encoding,
+        )
+        if stored is None:
+            raise ArticleNotFoundError("Article content not found")
+        return stored
+
+    async def _read_for_cache(self, s3_key: str) -> CachedContent | None:
+        stored = await self.s3_repo.open_article(s3_key, accept_encoding="*")
+        if stored is None:
+            raise ArticleNotFoundError("Article content not found")
+        if stored.content_length > self.content_cache.max_item_bytes:
+            await stored.body.aclose()
+            return None
+        return CachedContent(
+            body=b"".join([chunk async for chunk in stored.body]),
+            content_type=stored.content_type,
+            etag=stored.etag,
+            last_modified=stored.last_modified,
+            content_encoding=stored.content_encoding,
+            uncompressed_length=stored.uncompressed_length,
+        )
+
+
+async def iter_lines(
+    chunks: AsyncIterator[bytes],
+    max_line_bytes: int = settings.bulk_ingest.max_line_bytes,
+) -> AsyncIterator[bytes]:
+    buffer = bytearray()
+    async for chunk in chunks:
+        buffer += chunk
+        start = 0
+        while (end := buffer.find(b"\n", start)) != -1:
+            yield bytes(buffer[start:end])
+            start = end + 1
+        del buffer[:start]
+        if len(buffer) > max_line_bytes:
+            raise LineTooLongError(f"line exceeds {max_line_bytes} bytes")
+    if buffer:
+        yield bytes(buffer)
+
+
+async def spool(
+    chunks: AsyncIterator[bytes],
+    max_memory_bytes: int = settings.bulk_ingest.spool_memory_bytes,
+) -> tempfile.SpooledTemporaryFile:
+    spooled = tempfile.SpooledTemporaryFile(max_size=max_memory_bytes)
+    try:
+        async for chunk in chunks:
+            if getattr(spooled, "_rolled", True):
+                await asyncio.to_thread(spooled.write, chunk)
+            else:
+                spooled.write(chunk)
+        spooled.seek(0)
+    except BaseException:
+        spooled.close()
+        raise
+    return spooled
+
+
+async def iter_file(
+    file, chunk_size: int = settings.bulk_ingest.read_chunk_bytes
+) -> AsyncIterator[bytes]:
+    while chunk := await asyncio.to_thread(file.read, chunk_size):
+        yield chunk
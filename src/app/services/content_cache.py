@@ -0,0 +1,234 @@
+import asyncio
+import json
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from email.utils import format_datetime
+from typing import AsyncIterator, Awaitable, Callable, Optional
+
+from redis.exceptions import RedisError
+
+from src.app.core.cache import LRUCache
+from src.app.core.compression import accepts_encoding
+from src.app.core.config import settings
+from src.app.database.minio_helper import (
+    SINGLE_BYTE_RANGE,
+    InvalidRangeError,
+    StoredObject,
+)
+from src.app.database.redis_helper import RedisHelper, redis_helper
+
+_UNCACHEABLE = object()
+
+
+@dataclass
+class CachedContent:
+    body: bytes
+    content_type: str
+    etag: str | None = None
+    last_modified: datetime | None = None
+    content_encoding: str | None = None
+    uncompressed_length: int | None = None
+
+    def dumps(self) -> bytes:
+        header = {
+            "content_type": self.content_type,
+            "etag": self.etag,
+            "last_modified": (
+                self.last_modified.isoformat() if self.last_modified else None
+            ),
+            "content_encoding": self.content_encoding,
+            "uncompressed_length": self.uncompressed_length,
+        }
+        return json.dumps(header).encode() + b"\n" + self.body
+
+    @classmethod
+    def loads(cls, raw: bytes) -> "CachedContent":
+        header, body = raw.split(b"\n", 1)
+        meta = json.loads(header)
+        last_modified = meta.get("last_modified")
+        if last_modified:
+            last_modified = datetime.fromisoformat(last_modified)
+        return cls(
+            body=body,
+            content_type=meta["content_type"],
+            etag=meta.get("etag"),
+            last_modified=last_modified,
+            content_encoding=meta.get("content_encoding"),
+            uncompressed_length=meta.get("uncompressed_length"),
+        )
+
+    def open(
+        self,
+        byte_range: str | None = None,
+        if_range: str | None = None,
+        chunk_size: int = settings.s3.stream_chunk_size,
+        accept_encoding: str | None = None,
+    ) -> StoredObject:
+        total = len(self.body)
+        selected = None
+        if self.content_encoding is None or accepts_encoding(
+            accept_encoding, self.content_encoding
+        ):
+            selected = self._resolve_range(byte_range, if_range)
+        start, end = selected or (0, total - 1)
+        stored = StoredObject(
+            body=self._iter_slice(start, end + 1, chunk_size),
+            content_length=end - start + 1,
+            content_type=self.content_type,
+            etag=self.etag,
+            last_modified=self.last_modified,
+            content_range=f"bytes {start}-{end}/{total}" if selected else None,
+            content_encoding=self.content_encoding,
+            uncompressed_length=self.uncompressed_length,
+        )
+        return stored.negotiate(accept_encoding)
+
+    def _resolve_range(
+        self, byte_range: str | None, if_range: str | None
+    ) -> tuple[int, int] | None:
+        if not byte_range or not SINGLE_BYTE_RANGE.match(byte_range.strip()):
+            return None
+        if if_range and if_range not in self._validators():
+            return None
+        total = len(self.body)
+        first, last = byte_range.strip()[len("bytes=") :].split("-")
+        if not first:
+            suffix = int(last)
+            if suffix == 0 or total == 0:
+                raise InvalidRangeError(
+                    f"Range not satisfiable: {byte_range}", total=total
+                )
+            return max(total - suffix, 0), total - 1
+        start = int(first)
+        if last and int(last) < start:
+            return None
+        end = min(int(last), total - 1) if last else total - 1
+        if start >= total:
+            raise InvalidRangeError(f"Range not satisfiable: {byte_range}", total=total)
+        return start, end
+
+    def _validators(self) -> set[str]:
+        validators = set()
+        if self.etag and not self.etag.startswith("W/"):
+            validators.add(self.etag)
+        if self.last_modified:
+            validators.add(format_datetime(self.last_modified, usegmt=True))
+        return validators
+
+    async def _iter_slice(
+        self, start: int, stop: int, chunk_size: int
+    ) -> AsyncIterator[bytes]:
+        view = memoryview(self.body)
+        for offset in range(start, stop, chunk_size):
+            yield bytes(view[offset : min(offset + chunk_size, stop)])
+
+
+class ContentCache:
+    def __init__(
+        self,
+        redis: RedisHelper,
+        local: LRUCache,
+        redis_ttl_seconds: int,
+        max_item_bytes: int,
+        prefix: str = "article:content:",
+    ):
+        self.redis = redis
+        self.local = local
+        self.redis_ttl_seconds = redis_ttl_seconds
+        self.max_item_bytes = max_item_bytes
+        self.prefix = prefix
+        self.redis_hits = 0
+        self.redis_misses = 0
+        self.redis_errors = 0
+        self.fills = 0
+        self.coalesced = 0
+        self.logger = logging.getLogger(__name__)
+        self._inflight: dict[str, asyncio.Task] = {}
+
+    async def get_or_fill(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Optional[CachedContent]]],
+    ) -> Optional[CachedContent]:
+        cached = self.local.get(key)
+        if cached is not None:
+            return None if cached is _UNCACHEABLE else cached
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._fill(key, loader))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._fill_done(key, t))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        return {
+            "local": self.local.stats(),
+            "redis": {
+                "hits": self.redis_hits,
+                "misses": self.redis_misses,
+                "errors": self.redis_errors,
+            },
+            "fills": self.fills,
+            "coalesced": self.coalesced,
+            "inflight": len(self._inflight),
+        }
+
+    async def _fill(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Optional[CachedContent]]],
+    ) -> Optional[CachedContent]:
+        content = await self._redis_get(key)
+        if content is None:
+            self.fills += 1
+            content = await loader()
+            if content is None:
+                self.local.set(key, _UNCACHEABLE)
+                return None
+            await self._redis_set(key, content)
+        self.local.set(key, content, size=len(content.body))
+        return content
+
+    def _fill_done(self, key: str, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()
+
+    async def _redis_get(self, key: str) -> Optional[CachedContent]:
+        try:
+            raw = await self.redis.client.get(self.prefix + key)
+        except RedisError as e:
+            self.redis_errors += 1
+            self.logger.warning(f"Redis content cache read failed for {key}: {e}")
+            return None
+        if raw is None:
+            self.redis_misses += 1
+            return None
+        self.redis_hits += 1
+        return CachedContent.loads(raw)
+
+    async def _redis_set(self, key: str, content: CachedContent):
+        try:
+            await self.redis.client.set(
+                self.prefix + key, content.dumps(), ex=self.redis_ttl_seconds
+            )
+        except RedisError as e:
+            self.redis_errors += 1
+            self.logger.warning(f"Redis content cache write failed for {key}: {e}")
+
+
+content_cache = ContentCache(
+    redis=redis_helper,
+    local=LRUCache(
+        max_items=settings.content_cache.max_items,
+        max_bytes=settings.content_cache.max_bytes,
+        ttl_seconds=settings.content_cache.local_ttl_seconds,
+    ),
+    redis_ttl_seconds=settings.content_cache.redis_ttl_seconds,
+    max_item_bytes=settings.content_cache.max_item_bytes,
+)
@@ -0,0 +1,70 @@
+import hashlib
+import json
+import logging
+
+from redis.exceptions import RedisError
+
+from src.app.core.config import settings
+from src.app.database.redis_helper import RedisHelper, redis_helper
+
+GENERATION_KEY = "search:generation"
+
+
+class SearchCache:
+    def __init__(
+        self, redis: RedisHelper, ttl_seconds: int, prefix: str = "search:page:"
+    ):
+        self.redis = redis
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+        self.logger = logging.getLogger(__name__)
+
+    def _key(self, query: str, limit: int, cursor: str | None) -> str:
+        raw = f"{query}\x00{limit}\x00{cursor or ''}"
+        return self.prefix + hashlib.sha1(raw.encode()).hexdigest()
+
+    async def get(
+        self, query: str, limit: int, cursor: str | None
+    ) -> tuple[dict | None, int | None]:
+        try:
+            generation, raw = await self.redis.client.mget(
+                GENERATION_KEY, self._key(query, limit, cursor)
+            )
+        except RedisError as e:
+            self.logger.warning(f"Search cache read failed: {e}")
+            return None, None
+        generation = int(generation or 0)
+        if raw is None:
+            return None, generation
+        page = json.loads(raw)
+        if page.pop("generation", None) != generation:
+            return None, generation
+        return page, generation
+
+    async def set(
+        self,
+        query: str,
+        limit: int,
+        cursor: str | None,
+        generation: int,
+        page: dict,
+    ):
+        try:
+            await self.redis.client.set(
+                self._key(query, limit, cursor),
+                json.dumps({**page, "generation": generation}),
+                ex=self.ttl_seconds,
+            )
+        except RedisError as e:
+            self.logger.warning(f"Search cache write failed: {e}")
+
+    async def bump_generation(self):
+        try:
+            await self.redis.client.incr(GENERATION_KEY)
+        except RedisError as e:
+            self.logger.error(f"Failed to invalidate search cache: {e}")
+
+
+search_cache = SearchCache(
+    redis=redis_helper, ttl_seconds=settings.search_cache.ttl_seconds
+)
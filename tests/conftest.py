@@ -0,0 +1,31 @@
+import os
+import tempfile
+from pathlib import Path
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+
+def write_jwt_keys():
+    if os.getenv("AUTH_JWT__PRIVATE_KEY_PATH"):
+        return
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    certs = Path(tempfile.mkdtemp(prefix="test-certs-"))
+    (certs / "jwt-private.pem").write_bytes(
+        key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        )
+    )
+    (certs / "jwt-public.pem").write_bytes(
+        key.public_key().public_bytes(
+            serialization.Encoding.PEM,
+            serialization.PublicFormat.SubjectPublicKeyInfo,
+        )
+    )
+    os.environ["AUTH_JWT__PRIVATE_KEY_PATH"] = str(certs / "jwt-private.pem")
+    os.environ["AUTH_JWT__PUBLIC_KEY_PATH"] = str(certs / "jwt-public.pem")
+
+
+write_jwt_keys()
@@ -0,0 +1,103 @@
+import asyncio
+import json
+from contextlib import asynccontextmanager
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from src.app.auth.tokens import get_current_active_auth_user
+from src.app.routers import routers_articles
+from src.app.schemas.schemas import PrincipalSchema
+
+
+class FakeArticleRepository:
+    def __init__(self):
+        self.rows = []
+
+    async def claim_blobs(self, session, blobs):
+        return set()
+
+    async def add_articles(self, session, articles):
+        start = len(self.rows) + 1
+        self.rows += articles
+        return list(range(start, start + len(articles)))
+
+
+class FakeStorage:
+    def __init__(self):
+        self.objects = {}
+
+    async def upload_article(self, key, body):
+        self.objects[key] = body
+        return key
+
+
+@asynccontextmanager
+async def fake_session():
+    yield None
+
+
+@pytest.fixture
+def client(monkeypatch):
+    service = routers_articles.article_service
+    monkeypatch.setattr(service, "db_repo", FakeArticleRepository())
+    monkeypatch.setattr(service, "s3_repo", FakeStorage())
+    monkeypatch.setattr(service, "search_cache", None)
+    monkeypatch.setattr(routers_articles.db_helper, "session_factory", fake_session)
+
+    app = FastAPI()
+    app.include_router(routers_articles.router)
+    app.dependency_overrides[get_current_active_auth_user] = lambda: PrincipalSchema(
+        username="author", active=True
+    )
+    return httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://test"
+    )
+
+
+def post_lines(client, lines, chunk_size=7):
+    body = "".join(line + "\n" for line in lines).encode()
+
+    async def chunks():
+        for offset in range(0, len(body), chunk_size):
+            yield body[offset : offset + chunk_size]
+
+    async def scenario():
+        async with client:
+            return await asyncio.wait_for(
+                client.post("/articles/bulk/", content=chunks()), timeout=10
+            )
+
+    return asyncio.run(scenario())
+
+
+def article(i: int) -> str:
+    return json.dumps(
+        {"title": f"title {i}", "description": f"about {i}", "content": f"body {i}"}
+    )
+
+
+def test_bulk_ingest_reports_every_line(client):
+    lines = [article(1), "", article(2), '{"title": "no body"}', article(3)]
+    response = post_lines(client, lines)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    results = [json.loads(line) for line in response.text.splitlines()]
+    assert [result["index"] for result in results] == [0, 1, 2, 3]
+    assert [result.get("id") for result in results] == [1, 2, None, 3]
+    assert "error" in results[2]
+    service = routers_articles.article_service
+    assert [row["title"] for row in service.db_repo.rows] == [
+        "title 1",
+        "title 2",
+        "title 3",
+    ]
+    assert len(service.s3_repo.objects) == 3
+
+
+def test_bulk_ingest_spans_batches(client):
+    count = 1200
+    response = post_lines(client, [article(i) for i in range(count)], chunk_size=4096)
+    results = [json.loads(line) for line in response.text.splitlines()]
+    assert [result["id"] for result in results] == list(range(1, count + 1))
@@ -0,0 +1,63 @@
+import time
+
+from src.app.core.cache import LRUCache
+
+
+def test_evicts_least_recently_used():
+    cache = LRUCache(max_items=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.evictions == 1
+
+
+def test_evicts_by_bytes():
+    cache = LRUCache(max_items=10, max_bytes=10)
+    cache.set("a", b"x" * 6, size=6)
+    cache.set("b", b"y" * 6, size=6)
+    assert cache.get("a") is None
+    assert cache.bytes == 6
+
+
+def test_skips_items_larger_than_max_bytes():
+    cache = LRUCache(max_items=10, max_bytes=10)
+    cache.set("a", 1, size=4)
+    cache.set("big", 2, size=11)
+    assert cache.get("big") is None
+    assert cache.get("a") == 1
+
+
+def test_replacing_a_key_keeps_byte_count():
+    cache = LRUCache(max_items=10, max_bytes=10)
+    cache.set("a", 1, size=4)
+    cache.set("a", 2, size=5)
+    assert cache.bytes == 5
+    assert cache.get("a") == 2
+
+
+def test_ttl_expiry(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    cache = LRUCache(max_items=10, ttl_seconds=5)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl_seconds=60)
+    now[0] += 10
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+    assert cache.expirations == 1
+    assert cache.bytes == 0
+
+
+def test_delete_and_clear():
+    cache = LRUCache(max_items=10, max_bytes=100)
+    cache.set("a", 1, size=10)
+    cache.set("b", 2, size=10)
+    assert cache.delete("a")
+    assert not cache.delete("a")
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.bytes == 0
@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("zstandard")
+
+from src.app.core.compression import (  # noqa: E402
+    accepts_encoding,
+    compress,
+    compressor,
+    decompress,
+    iter_decompressed,
+)
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, codec, expected",
+    [
+        (None, "zstd", False),
+        ("", "zstd", False),
+        ("gzip, deflate, br", "gzip", True),
+        ("gzip, deflate, br", "zstd", False),
+        ("br;q=1.0, ZSTD;q=0.5", "zstd", True),
+        ("zstd;q=0", "zstd", False),
+        ("*", "zstd", True),
+        ("*;q=0", "gzip", False),
+        ("gzip;q=0, *", "gzip", False),
+        ("zstd;q=bogus", "zstd", False),
+    ],
+)
+def test_accepts_encoding(accept_encoding, codec, expected):
+    assert accepts_encoding(accept_encoding, codec) is expected
+
+
+@pytest.mark.parametrize("codec", ["gzip", "zstd"])
+def test_round_trip(codec):
+    data = "статья ".encode() * 1000
+    assert decompress(compress(data, codec), codec) == data
+
+
+@pytest.mark.parametrize("codec", ["gzip", "zstd"])
+def test_streaming_compressor_matches_one_shot(codec):
+    data = b"chunked article body " * 5000
+    encoder = compressor(codec)
+    encoded = b"".join(
+        encoder.compress(data[offset : offset + 4096])
+        for offset in range(0, len(data), 4096)
+    )
+    encoded += encoder.flush()
+    assert decompress(encoded, codec) == data
+
+
+@pytest.mark.parametrize("codec", ["gzip", "zstd"])
+def test_iter_decompressed(codec):
+    data = b"0123456789" * 10000
+    encoded = compress(data, codec)
+
+    async def chunks():
+        for offset in range(0, len(encoded), 1000):
+            yield encoded[offset : offset + 1000]
+
+    async def collect():
+        return b"".join([chunk async for chunk in iter_decompressed(chunks(), codec)])
+
+    assert asyncio.run(collect()) == data
+
+
+def test_unknown_codec():
+    with pytest.raises(ValueError):
+        compress(b"x", "br")
@@ -0,0 +1,160 @@
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from src.app.core.cache import LRUCache  # noqa: E402
+from src.app.core.compression import compress  # noqa: E402
+from src.app.services.content_cache import CachedContent, ContentCache  # noqa: E402
+
+BODY = b"0123456789"
+ETAG = '"abc"'
+LAST_MODIFIED = datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def cached(body: bytes = BODY, **kwargs) -> CachedContent:
+    return CachedContent(
+        body=body,
+        content_type="text/plain; charset=utf-8",
+        etag=ETAG,
+        last_modified=LAST_MODIFIED,
+        **kwargs,
+    )
+
+
+def read(stored) -> bytes:
+    async def collect():
+        return b"".join([chunk async for chunk in stored.body])
+
+    return run(collect())
+
+
+def test_open_encoded_for_accepting_client():
+    body = BODY * 100
+    encoded = compress(body, "gzip")
+    content = cached(encoded, content_encoding="gzip", uncompressed_length=len(body))
+    stored = content.open(byte_range="bytes=0-9", accept_encoding="gzip")
+    assert stored.content_encoding == "gzip"
+    assert stored.content_range == f"bytes 0-9/{len(encoded)}"
+    assert read(stored) == encoded[:10]
+
+
+def test_open_encoded_decodes_and_ignores_range_for_other_clients():
+    body = BODY * 100
+    content = cached(
+        compress(body, "gzip"), content_encoding="gzip", uncompressed_length=len(body)
+    )
+    stored = content.open(byte_range="bytes=0-9", accept_encoding="identity")
+    assert stored.content_encoding is None
+    assert not stored.partial
+    assert stored.content_length == len(body)
+    assert stored.etag == f"W/{ETAG}"
+    assert read(stored) == body
+
+
+def test_dumps_round_trip():
+    content = cached(content_encoding="zstd", uncompressed_length=99)
+    assert CachedContent.loads(content.dumps()) == content
+
+
+class FakeRedisHelper:
+    def __init__(self):
+        self.client = fakeredis.FakeAsyncRedis(server=fakeredis.FakeServer())
+
+
+def make_cache() -> ContentCache:
+    return ContentCache(
+        redis=FakeRedisHelper(),
+        local=LRUCache(max_items=10, max_bytes=1024),
+        redis_ttl_seconds=60,
+        max_item_bytes=1024,
+    )
+
+
+def test_get_or_fill_single_flight():
+    async def scenario():
+        cache = make_cache()
+        release = asyncio.Event()
+        calls = 0
+
+        async def loader():
+            nonlocal calls
+            calls += 1
+            await release.wait()
+            return cached()
+
+        waiters = [
+            asyncio.create_task(cache.get_or_fill("key", loader)) for _ in range(5)
+        ]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*waiters)
+        again = await cache.get_or_fill("key", loader)
+        return cache, calls, results, again
+
+    cache, calls, results, again = run(scenario())
+    assert calls == 1
+    assert cache.coalesced == 4
+    assert all(result == cached() for result in results)
+    assert again == cached()
+    assert cache.stats()["inflight"] == 0
+
+
+def test_get_or_fill_from_redis():
+    async def scenario():
+        first, second = make_cache(), make_cache()
+        second.redis = first.redis
+
+        async def loader():
+            return cached()
+
+        async def unexpected():
+            raise AssertionError("loader should not run")
+
+        await first.get_or_fill("key", loader)
+        return second, await second.get_or_fill("key", unexpected)
+
+    second, content = run(scenario())
+    assert content == cached()
+    assert second.redis_hits == 1
+
+
+def test_get_or_fill_remembers_uncacheable():
+    async def scenario():
+        cache = make_cache()
+        calls = 0
+
+        async def loader():
+            nonlocal calls
+            calls += 1
+            return None
+
+        first = await cache.get_or_fill("key", loader)
+        second = await cache.get_or_fill("key", loader)
+        return calls, first, second
+
+    calls, first, second = run(scenario())
+    assert (calls, first, second) == (1, None, None)
+
+
+def test_failed_fill_is_not_cached():
+    async def scenario():
+        cache = make_cache()
+
+        async def failing():
+            raise RuntimeError("storage down")
+
+        async def loader():
+            return cached()
+
+        with pytest.raises(RuntimeError):
+            await cache.get_or_fill("key", failing)
+        return await cache.get_or_fill("key", loader)
+
+    assert run(scenario()) == cached()
@@ -0,0 +1,95 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from src.app.auth import utils as auth_utils
+from src.app.auth.tokens import (
+    create_access_token,
+    create_refresh_token,
+    get_current_token_payload,
+)
+from src.app.core.cache import LRUCache
+from src.app.database.minio_helper import S3Repository, content_key
+from src.app.schemas.schemas import PrincipalSchema
+from src.app.services.article_service import UPLOAD_TOKEN_TYPE, ArticleService
+
+DIGEST_KEY = content_key(b"article")
+PLAIN_KEY = "articles/1.txt"
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+class HeadClient:
+    def __init__(self, encodings: dict[str, str | None]):
+        self.encodings = encodings
+        self.heads = 0
+
+    async def head_object(self, Bucket, Key, **params):
+        self.heads += 1
+        response = {"ContentLength": 7}
+        if self.encodings[Key]:
+            response["ContentEncoding"] = self.encodings[Key]
+        return response
+
+    async def generate_presigned_url(self, operation, Params, ExpiresIn):
+        return f"http://s3.test/{Params['Key']}"
+
+
+class FakeArticleRepository:
+    async def get_article_metadata(self, session, article_id):
+        return SimpleNamespace(s3_key={1: DIGEST_KEY, 2: PLAIN_KEY}[article_id])
+
+
+def make_service(encodings, compression=None) -> tuple[ArticleService, HeadClient]:
+    repo = S3Repository(
+        "http://s3.test",
+        "key",
+        "secret",
+        "articles",
+        compression=compression,
+        content_encodings=LRUCache(max_items=10),
+    )
+    repo._client = HeadClient(encodings)
+    return ArticleService(FakeArticleRepository(), repo), repo._client
+
+
+def content_url(service: ArticleService, article_id: int, accept_encoding):
+    return run(
+        service.article_content_url(
+            session=None, article_id=article_id, accept_encoding=accept_encoding
+        )
+    )
+
+
+def test_content_url_follows_stored_encoding():
+    service, _ = make_service({DIGEST_KEY: "gzip", PLAIN_KEY: None}, "zstd")
+    assert content_url(service, 1, "zstd") is None
+    assert content_url(service, 1, "gzip") == f"http://s3.test/{DIGEST_KEY}"
+    assert content_url(service, 2, None) == f"http://s3.test/{PLAIN_KEY}"
+
+
+def test_encoding_is_memoized_for_content_addressed_keys():
+    service, client = make_service({DIGEST_KEY: None, PLAIN_KEY: "gzip"})
+    for _ in range(3):
+        assert run(service.s3_repo.article_encoding(DIGEST_KEY)) is None
+        assert run(service.s3_repo.article_encoding(PLAIN_KEY)) == "gzip"
+    assert client.heads == 4
+
+
+def test_bearer_rejects_upload_tokens():
+    token = auth_utils.encode_jwt(
+        payload={"type": UPLOAD_TOKEN_TYPE, "sub": "author", "s3_key": DIGEST_KEY}
+    )
+    with pytest.raises(HTTPException) as e:
+        run(get_current_token_payload(token))
+    assert e.value.status_code == 401
+
+
+def test_bearer_accepts_session_tokens():
+    user = PrincipalSchema(username="author", active=True)
+    for token in (create_access_token(user), create_refresh_token(user, "sid")):
+        assert run(get_current_token_payload(token))["sub"] == "author"
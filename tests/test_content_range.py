@@ -0,0 +1,110 @@
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+from botocore.exceptions import ClientError
+
+from src.app.database.minio_helper import InvalidRangeError, S3Repository
+from src.app.services.content_cache import CachedContent
+
+BODY = b"0123456789"
+ETAG = '"abc"'
+LAST_MODIFIED = datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def cached(body: bytes = BODY, **kwargs) -> CachedContent:
+    return CachedContent(
+        body=body,
+        content_type="text/plain; charset=utf-8",
+        etag=ETAG,
+        last_modified=LAST_MODIFIED,
+        **kwargs,
+    )
+
+
+def read(stored) -> bytes:
+    async def collect():
+        return b"".join([chunk async for chunk in stored.body])
+
+    return run(collect())
+
+
+@pytest.mark.parametrize(
+    "byte_range, expected",
+    [
+        ("bytes=2-5", (2, 5)),
+        ("bytes=7-", (7, 9)),
+        ("bytes=-3", (7, 9)),
+        ("bytes=-30", (0, 9)),
+        ("bytes=8-100", (8, 9)),
+        (" bytes=0-0 ", (0, 0)),
+    ],
+)
+def test_resolve_range(byte_range, expected):
+    assert cached()._resolve_range(byte_range, None) == expected
+
+
+@pytest.mark.parametrize(
+    "byte_range",
+    [None, "", "bytes=0-1,4-5", "items=0-1", "bytes=5-2", "bytes=abc"],
+)
+def test_ignored_ranges(byte_range):
+    assert cached()._resolve_range(byte_range, None) is None
+
+
+@pytest.mark.parametrize("byte_range", ["bytes=10-", "bytes=-0", "bytes=20-30"])
+def test_unsatisfiable_range_reports_length(byte_range):
+    with pytest.raises(InvalidRangeError) as e:
+        cached()._resolve_range(byte_range, None)
+    assert e.value.total == len(BODY)
+
+
+def test_if_range():
+    content = cached()
+    http_date = "Tue, 02 Jan 2024 03:04:05 GMT"
+    assert content._resolve_range("bytes=2-5", ETAG) == (2, 5)
+    assert content._resolve_range("bytes=2-5", http_date) == (2, 5)
+    assert content._resolve_range("bytes=2-5", '"other"') is None
+    assert content._resolve_range("bytes=2-5", f"W/{ETAG}") is None
+
+
+def test_open_partial():
+    stored = cached().open(byte_range="bytes=2-5", chunk_size=3)
+    assert stored.partial
+    assert stored.content_range == "bytes 2-5/10"
+    assert stored.content_length == 4
+    assert read(stored) == b"2345"
+
+
+def test_open_full():
+    stored = cached().open(chunk_size=4)
+    assert not stored.partial
+    assert stored.content_length == len(BODY)
+    assert read(stored) == BODY
+
+
+class RangeRejectingClient:
+    def __init__(self, actual_size: str | None):
+        self.actual_size = actual_size
+
+    async def get_object(self, **params):
+        error = {"Code": "InvalidRange", "Message": "InvalidRange"}
+        if self.actual_size is not None:
+            error["ActualObjectSize"] = self.actual_size
+        raise ClientError({"Error": error}, "GetObject")
+
+    async def head_object(self, **params):
+        return {"ContentLength": len(BODY)}
+
+
+@pytest.mark.parametrize("actual_size", ["10", None])
+def test_storage_unsatisfiable_range_reports_length(actual_size):
+    repo = S3Repository("http://s3.test", "key", "secret", "articles")
+    repo._client = RangeRejectingClient(actual_size)
+    with pytest.raises(InvalidRangeError) as e:
+        run(repo.open_article("articles/1.txt", byte_range="bytes=20-"))
+    assert e.value.total == len(BODY)
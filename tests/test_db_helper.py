@@ -0,0 +1,32 @@
+import asyncio
+
+from src.app.database.db_helper import DB_halper
+
+
+def make_helper() -> DB_halper:
+    return DB_halper(db_url="postgresql+asyncpg://user@localhost/test")
+
+
+async def open_session(helper: DB_halper):
+    dependency = helper.session_dependency()
+    session = await dependency.__anext__()
+    return dependency, session
+
+
+def test_session_dependency_uses_one_registry_per_task():
+    async def scenario():
+        helper = make_helper()
+        dependency, session = await open_session(helper)
+        same_task = helper.scoped_session()
+        other_task = await asyncio.create_task(open_session(helper))
+        await dependency.aclose()
+        after_close = helper.scoped_session()
+        await helper.scoped_session.remove()
+        await other_task[0].aclose()
+        await helper.dispose()
+        return session, same_task, other_task[1], after_close
+
+    session, same_task, other_task, after_close = asyncio.run(scenario())
+    assert same_task is session
+    assert other_task is not session
+    assert after_close is not session
@@ -0,0 +1,128 @@
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from src.app.auth.mail_worker import MailWorker  # noqa: E402
+from src.app.auth.send_mail import MailQueue  # noqa: E402
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+class FailingSender:
+    sender = "noreply@example.com"
+
+    def __init__(self):
+        self.sent = []
+
+    def send_batch(self, messages):
+        self.sent += messages
+        return [OSError("smtp down") for _ in messages]
+
+    def close(self):
+        pass
+
+
+def make_worker(max_attempts: int = 3) -> MailWorker:
+    redis = SimpleNamespace(
+        client=fakeredis.FakeAsyncRedis(server=fakeredis.FakeServer())
+    )
+    queue = MailQueue(
+        redis=redis,
+        stream_key="mail:stream",
+        group="mail-workers",
+        dead_letter_key="mail:dead",
+        retry_key="mail:retry",
+        claim_idle_seconds=300.0,
+        consumer="test",
+    )
+    return MailWorker(
+        queue=queue,
+        sender=FailingSender(),
+        batch_size=10,
+        max_attempts=max_attempts,
+        poll_timeout=0.01,
+        retry_base_seconds=30.0,
+        retry_max_seconds=45.0,
+    )
+
+
+async def make_due(worker: MailWorker):
+    client = worker.queue.redis.client
+    for member in await client.zrange("mail:retry", 0, -1):
+        await client.zadd("mail:retry", {member: 0})
+
+
+def test_failed_send_is_delayed_with_backoff():
+    async def scenario():
+        worker = make_worker()
+        client = worker.queue.redis.client
+        await worker.queue.enqueue_confirmation("token", "user@example.com")
+        started = time.time()
+        await worker.process_batch()
+        retries = await client.zrange("mail:retry", 0, -1, withscores=True)
+        immediate = await worker.process_batch()
+        await make_due(worker)
+        await worker.process_batch()
+        delays = [
+            score - time.time()
+            for _, score in await client.zrange("mail:retry", 0, -1, withscores=True)
+        ]
+        return started, retries, immediate, delays, await client.xlen("mail:stream")
+
+    started, retries, immediate, delays, stream_len = run(scenario())
+    [(member, due)] = retries
+    assert json.loads(member)["attempt"] == 1
+    assert 30 <= due - started < 31
+    assert immediate == 0
+    assert [round(delay) for delay in delays] == [45]
+    assert stream_len == 0
+
+
+def test_message_is_dead_lettered_after_max_attempts():
+    async def scenario():
+        worker = make_worker(max_attempts=2)
+        client = worker.queue.redis.client
+        await worker.queue.enqueue_confirmation("token", "user@example.com")
+        await worker.process_batch()
+        await make_due(worker)
+        await worker.process_batch()
+        return (
+            worker.sender.sent,
+            await client.zcard("mail:retry"),
+            await client.xrange("mail:dead"),
+        )
+
+    sent, retries, dead = run(scenario())
+    assert [address for address, _ in sent] == ["user@example.com"] * 2
+    assert retries == 0
+    [(_, fields)] = dead
+    assert json.loads(fields[b"message"])["attempt"] == 1
+
+
+def test_idle_worker_waits_between_polls():
+    async def scenario():
+        worker = make_worker()
+        worker.poll_timeout = 0.05
+        calls = 0
+        process_batch = worker.process_batch
+
+        async def counting_process_batch():
+            nonlocal calls
+            calls += 1
+            return await process_batch()
+
+        worker.process_batch = counting_process_batch
+        task = asyncio.create_task(worker.run())
+        await asyncio.sleep(0.3)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return calls
+
+    assert 2 <= run(scenario()) <= 8
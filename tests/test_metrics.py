@@ -0,0 +1,81 @@
+import asyncio
+
+import httpx
+from fastapi import FastAPI
+from prometheus_client import REGISTRY
+
+from src.app.core.metrics import PrometheusMiddleware
+from src.app.routers import routers_stats
+
+
+def make_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: int):
+        return {"id": item_id}
+
+    app.add_middleware(PrometheusMiddleware, route_cache_size=10)
+    app.include_router(routers_stats.router)
+    return app
+
+
+async def request(app: FastAPI, method: str, path: str) -> httpx.Response:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        return await c.request(method, path)
+
+
+def observed(method: str, route: str, status: str) -> float:
+    return (
+        REGISTRY.get_sample_value(
+            "http_request_duration_seconds_count",
+            {"method": method, "route": route, "status": status},
+        )
+        or 0
+    )
+
+
+def find_middleware(app: FastAPI) -> PrometheusMiddleware:
+    layer = app.middleware_stack
+    while not isinstance(layer, PrometheusMiddleware):
+        layer = layer.app
+    return layer
+
+
+def test_route_templates_are_memoized():
+    app = make_app()
+    before = observed("GET", "/items/{item_id}", "200")
+
+    async def scenario():
+        await request(app, "GET", "/items/1")
+        middleware = find_middleware(app)
+        middleware._match_route = None
+        await request(app, "GET", "/items/1")
+        return middleware
+
+    middleware = asyncio.run(scenario())
+    assert observed("GET", "/items/{item_id}", "200") == before + 2
+    assert middleware.routes.get(("GET", "/items/1")) == "/items/{item_id}"
+
+
+def test_unmatched_paths_are_not_memoized():
+    app = make_app()
+
+    async def scenario():
+        await request(app, "GET", "/missing")
+        return find_middleware(app)
+
+    assert len(asyncio.run(scenario()).routes) == 0
+
+
+def test_stats_require_authentication():
+    app = make_app()
+
+    async def scenario():
+        return [
+            (await request(app, "GET", path)).status_code
+            for path in ("/stats/cache/", "/stats/db-pool/")
+        ]
+
+    assert asyncio.run(scenario()) == [401, 401]
@@ -0,0 +1,30 @@
+import pytest
+
+from src.app.core.pagination import InvalidCursorError, decode_cursor, encode_cursor
+
+
+def test_cursor_round_trip():
+    position = {"n": 12, "j": 3, "b": 4, "h": -(2**63), "i": 42}
+    cursor = encode_cursor(position)
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == position
+
+
+def test_cursor_is_url_safe():
+    cursor = encode_cursor({"q": "заголовок ?&/+"})
+    assert all(c.isalnum() or c in "-_" for c in cursor)
+    assert decode_cursor(cursor) == {"q": "заголовок ?&/+"}
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "not a cursor!",
+        "////",
+        "WzEsMl0",  # [1,2]
+        "bnVsbA",  # null
+    ],
+)
+def test_invalid_cursor(cursor):
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(cursor)
@@ -0,0 +1,84 @@
+import asyncio
+import json
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from src.app.auth.principals import PrincipalCache  # noqa: E402
+from src.app.core.cache import LRUCache  # noqa: E402
+from src.app.database.models import UserModel  # noqa: E402
+from src.app.schemas.schemas import PrincipalSchema  # noqa: E402
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+class FakeRedisHelper:
+    def __init__(self, server=None):
+        self.client = fakeredis.FakeAsyncRedis(server=server or fakeredis.FakeServer())
+
+    def subscribe(self, channel, handler, on_subscribe=None):
+        pass
+
+    async def publish(self, channel, message):
+        await self.client.publish(channel, message)
+
+
+def make_cache(redis: FakeRedisHelper) -> PrincipalCache:
+    return PrincipalCache(
+        redis=redis, local=LRUCache(max_items=10), redis_ttl_seconds=60
+    )
+
+
+async def load_user():
+    return UserModel(
+        username="alice", password=b"$2b$12$hash", email="alice@example.com", active=1
+    )
+
+
+async def unexpected():
+    raise AssertionError("loader should not run")
+
+
+def test_principal_is_cached_without_password():
+    async def scenario():
+        redis = FakeRedisHelper()
+        user = await make_cache(redis).get("alice", loader=load_user)
+        raw = await redis.client.get("auth:principal:alice")
+        return user, json.loads(raw)
+
+    user, stored = run(scenario())
+    expected = PrincipalSchema(username="alice", email="alice@example.com", active=True)
+    assert user == expected
+    assert stored == expected.model_dump()
+    assert "password" not in stored
+
+
+def test_other_workers_read_principal_from_redis():
+    async def scenario():
+        server = fakeredis.FakeServer()
+        await make_cache(FakeRedisHelper(server)).get("alice", loader=load_user)
+        return await make_cache(FakeRedisHelper(server)).get("alice", loader=unexpected)
+
+    assert run(scenario()).username == "alice"
+
+
+def test_invalidate_drops_both_tiers():
+    async def scenario():
+        redis = FakeRedisHelper()
+        cache = make_cache(redis)
+        await cache.get("alice", loader=load_user)
+        await cache.invalidate("alice")
+        calls = 0
+
+        async def loader():
+            nonlocal calls
+            calls += 1
+            return await load_user()
+
+        await cache.get("alice", loader=loader)
+        return calls
+
+    assert run(scenario()) == 1
@@ -0,0 +1,56 @@
+import asyncio
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from src.app.services.search_cache import SearchCache  # noqa: E402
+
+PAGE = {"ids": [3, 1, 2], "next_cursor": None, "total": 3, "total_is_estimate": False}
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+class FakeRedisHelper:
+    def __init__(self):
+        self.client = fakeredis.FakeAsyncRedis(server=fakeredis.FakeServer())
+
+
+def test_miss_then_hit():
+    async def scenario():
+        cache = SearchCache(FakeRedisHelper(), ttl_seconds=60)
+        missed, generation = await cache.get("'кошк'", 20, None)
+        await cache.set("'кошк'", 20, None, generation, PAGE)
+        return missed, generation, await cache.get("'кошк'", 20, None)
+
+    missed, generation, (page, again) = run(scenario())
+    assert (missed, generation) == (None, 0)
+    assert (page, again) == (PAGE, 0)
+
+
+def test_key_includes_page():
+    async def scenario():
+        cache = SearchCache(FakeRedisHelper(), ttl_seconds=60)
+        await cache.set("'кошк'", 20, None, 0, PAGE)
+        return [
+            (await cache.get(query, limit, cursor))[0]
+            for query, limit, cursor in [
+                ("'кошк'", 10, None),
+                ("'кошк'", 20, "cursor"),
+                ("'собак'", 20, None),
+            ]
+        ]
+
+    assert run(scenario()) == [None, None, None]
+
+
+def test_bump_generation_invalidates_pages():
+    async def scenario():
+        cache = SearchCache(FakeRedisHelper(), ttl_seconds=60)
+        await cache.set("'кошк'", 20, None, 0, PAGE)
+        await cache.bump_generation()
+        return await cache.get("'кошк'", 20, None)
+
+    assert run(scenario()) == (None, 1)